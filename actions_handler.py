@@ -1,3 +1,4 @@
+import bisect
 import os
 import shutil
 import subprocess
@@ -62,6 +63,9 @@ class ActionsHandler:
     implementations.
     """
 
+    # Фиксированные шаги масштаба (в пределах 0.25–5.0, как в on_zoom_changed)
+    ZOOM_STEPS = (0.25, 0.33, 0.5, 0.67, 0.75, 1.0, 1.25, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0)
+
     def __init__(self, main_window):
         self.main_window = main_window
         self.ui = main_window.ui
@@ -326,17 +330,15 @@ class ActionsHandler:
     # Helpers for page visibility/order (compatible with old & new viewers)
     # -----------------------------
     def get_visible_pages_in_layout_order(self) -> List[int]:
-        pv = getattr(self.ui, 'pdfView', None)
-        if not pv:
-            return []
-
-        total = pv.document.current_doc.page_count
-        return list(range(total)) if total else []
+        # Layout indices of non-deleted pages, maintained by MainWindow on layout changes
+        return self.main_window.display_order()
 
     def _get_total_pages(self) -> int:
         pv = getattr(self.ui, 'pdfView', None)
         if not pv:
             return 0
+        if hasattr(pv, 'get_page_count'):
+            return pv.get_page_count()
         if hasattr(pv, 'get_total_pages'):
             try:
                 return int(pv.get_total_pages())
@@ -359,7 +361,7 @@ class ActionsHandler:
         if not menu:
             return
 
-        # Remove previous actions we added
+        # Remove previous actions we added (file entries, placeholder and separator)
         for act in self.recent_file_actions:
             try:
                 menu.removeAction(act)
@@ -378,21 +380,69 @@ class ActionsHandler:
             self.recent_file_actions.append(action)
             return
 
-        for i, file_path in enumerate(recent_files[:max_items]):
-            text = f"{i + 1}. {os.path.basename(file_path)}"
-            act = QAction(text, menu)
-            act.setToolTip(file_path)
-            # capture path correctly at definition time
-            act.triggered.connect(lambda checked=False, p=file_path: self.open_recent_file(p))
+        for file_path in recent_files[:max_items]:
+            act = self._make_recent_file_action(menu, file_path)
             menu.addAction(act)
             self.recent_file_actions.append(act)
+        self._renumber_recent_file_actions()
 
         # trailing separator + clear action if available
         clear_act = getattr(self.ui, 'actionClearRecentFiles', None)
         if clear_act:
-            menu.addSeparator()
+            self.recent_file_actions.append(menu.addSeparator())
             menu.addAction(clear_act)
 
+    def _make_recent_file_action(self, menu, file_path: str) -> QAction:
+        act = QAction(menu)
+        act.setData(file_path)
+        act.setToolTip(file_path)
+        # capture path correctly at definition time
+        act.triggered.connect(lambda checked=False, p=file_path: self.open_recent_file(p))
+        return act
+
+    def _renumber_recent_file_actions(self):
+        number = 0
+        for act in self.recent_file_actions:
+            file_path = act.data()
+            if file_path:
+                number += 1
+                act.setText(f"{number}. {os.path.basename(file_path)}")
+
+    def prepend_recent_file(self, file_path: str):
+        """Record file_path as most recent and move/insert just its menu entry.
+
+        The submenu is only rebuilt when it shows the "no recent files" placeholder.
+        """
+        settings_manager.add_recent_file(file_path)
+        menu = getattr(self.ui, 'menuOpenRecent', None)
+        if not menu:
+            return
+        entries = [act for act in self.recent_file_actions if act.data()]
+        if not entries:
+            self.update_recent_files_menu()
+            return
+        if entries[0].data() == file_path:
+            return
+
+        existing = next((act for act in entries if act.data() == file_path), None)
+        if existing is not None:
+            self.recent_file_actions.remove(existing)
+            menu.removeAction(existing)
+            act = existing
+        else:
+            act = self._make_recent_file_action(menu, file_path)
+        menu.insertAction(entries[0], act)
+        self.recent_file_actions.insert(self.recent_file_actions.index(entries[0]), act)
+
+        # Trim entries past the limit
+        max_items = getattr(settings_manager, 'MAX_RECENT_FILES', 10)
+        entries = [a for a in self.recent_file_actions if a.data()]
+        for old in entries[max_items:]:
+            self.recent_file_actions.remove(old)
+            menu.removeAction(old)
+            old.deleteLater()
+        self._renumber_recent_file_actions()
+
     def open_recent_file(self, file_path: str):
         if not os.path.exists(file_path):
             QMessageBox.warning(
@@ -453,8 +503,7 @@ class ActionsHandler:
             if not file_path:
                 return
             settings_manager.save_last_directory(os.path.dirname(file_path))
-            settings_manager.add_recent_file(file_path)
-            self.update_recent_files_menu()
+            self.prepend_recent_file(file_path)
             self._launch_new_instance(file_path)
             return
 
@@ -478,8 +527,7 @@ class ActionsHandler:
 
         # Save path and recent file (this happens regardless of window choice)
         settings_manager.save_last_directory(os.path.dirname(file_path))
-        settings_manager.add_recent_file(file_path)
-        self.update_recent_files_menu()
+        self.prepend_recent_file(file_path)
 
         # Check if a document is currently open
         pv = getattr(self.ui, 'pdfView', None)
@@ -529,6 +577,8 @@ class ActionsHandler:
         return "same" if same_radio.isChecked() else "new"
 
     def _launch_new_instance(self, file_path: str):
+        # The child reads QSettings at startup: flush what this instance still buffers
+        settings_manager.sync()
         try:
             # Get the path to the executable/script
             if getattr(sys, 'frozen', False):
@@ -595,9 +645,7 @@ class ActionsHandler:
             return False
 
         last_dir = settings_manager.get_last_directory()
-        base = os.path.splitext(os.path.basename(getattr(self.main_window, 'current_document_path', '') or 'document'))[
-            0]
-        default_name = f"{base}_modified.pdf" if base else "document.pdf"
+        default_name = f"{self.main_window.default_export_basename()}_modified.pdf"
         file_path, _ = QFileDialog.getSaveFileName(
             self.main_window,
             "Save PDF As",
@@ -622,13 +670,9 @@ class ActionsHandler:
             ok = bool(pv.save_document(file_path))
 
         if ok:
-            self.main_window.current_document_path = file_path
-            if hasattr(self.main_window, 'setWindowTitle'):
-                filename = os.path.basename(file_path)
-                self.main_window.setWindowTitle(f"{APP_NAME} — {filename}")
+            self.main_window.set_current_document(file_path)
             self._mark_not_modified()
-            settings_manager.add_recent_file(file_path)
-            self.update_recent_files_menu()
+            self.prepend_recent_file(file_path)
             return True
 
         QMessageBox.critical(self.main_window, "Ошибка при сохранении", "Не удалось сохранить документ.")
@@ -661,17 +705,15 @@ class ActionsHandler:
         if m_document:
             m_document.close()
 
-        self.main_window.current_document_path = ""
-        self._mark_not_modified(update_title=True)
+        self.main_window.reset_document_state()
+        self._mark_not_modified()
         if hasattr(self.main_window, 'update_page_info'):
             self.main_window.update_page_info()
 
-    def _mark_not_modified(self, update_title: bool = False):
+    def _mark_not_modified(self):
         self.main_window.is_document_modified = False
         if hasattr(self.main_window, 'update_ui_state'):
             self.main_window.update_ui_state()
-        if update_title and hasattr(self.main_window, 'setWindowTitle'):
-            self.main_window.setWindowTitle(APP_NAME)
         if hasattr(self.main_window, 'update_window_title'):
             self.main_window.update_window_title()
 
@@ -709,54 +751,23 @@ class ActionsHandler:
     # Navigation (respect layout order when available)
     # -----------------------------
     def previous_page(self):
-        pv = getattr(self.ui, 'pdfView', None)
-        if not pv:
-            return
-
-        if hasattr(pv, 'previous_page'):
-            pv.previous_page()
-            return
-
-        if hasattr(pv, 'get_current_page') and hasattr(pv, 'layout_index_for_original'):
-            current_original = pv.get_current_page()
-            current_layout = pv.layout_index_for_original(current_original)
-            vis = self.get_visible_pages_in_layout_order()
-            if current_layout in vis:
-                i = vis.index(current_layout)
-                if i > 0:
-                    pv.go_to_page(vis[i - 1])
+        # PDFViewer steps through layout indices itself
+        self.ui.pdfView.previous_page()
 
     def next_page(self):
-        pv = getattr(self.ui, 'pdfView', None)
-        if not pv:
-            return
-
-        if hasattr(pv, 'next_page'):
-            pv.next_page()
-            return
-
-        if hasattr(pv, 'get_current_page') and hasattr(pv, 'layout_index_for_original'):
-            current_original = pv.get_current_page()
-            current_layout = pv.layout_index_for_original(current_original)
-            vis = self.get_visible_pages_in_layout_order()
-            if current_layout in vis:
-                i = vis.index(current_layout)
-                if i < len(vis) - 1:
-                    pv.go_to_page(vis[i + 1])
+        self.ui.pdfView.next_page()
 
     def jump_to_first_page(self):
         pv = getattr(self.ui, 'pdfView', None)
-        if hasattr(pv, 'go_to_page'):
-            vis = self.get_visible_pages_in_layout_order()
-            if vis:
-                pv.go_to_page(vis[0])
+        if hasattr(pv, 'go_to_page') and pv.get_page_count():
+            pv.go_to_page(0)
 
     def jump_to_last_page(self):
         pv = getattr(self.ui, 'pdfView', None)
         if hasattr(pv, 'go_to_page'):
-            vis = self.get_visible_pages_in_layout_order()
-            if vis:
-                pv.go_to_page(vis[-1])
+            total = pv.get_page_count()
+            if total:
+                pv.go_to_page(total - 1)
 
     # -----------------------------
     # View ops
@@ -773,24 +784,27 @@ class ActionsHandler:
     #         if zoom_value is not None:
     #             selector.set_zoom_value(float(zoom_value))
 
-    def zoom_in(self):
+    def _zoom_to(self, direction: int):
+        """Переход к соседнему шагу масштаба из ZOOM_STEPS (direction: +1 / -1)."""
         pv = getattr(self.ui, 'pdfView', None)
         pv.zoom_type = 0
-        if hasattr(pv, 'zoom_in'):
-            pv.zoom_in()
-        elif hasattr(pv, 'set_zoom'):
-            current = getattr(pv, 'zoom_level', 1.0)
-            pv.set_zoom(min(5.0, current * 1.25))
+        current = self.main_window.current_zoom()
+        steps = self.ZOOM_STEPS
+        if direction > 0:
+            i = bisect.bisect_right(steps, current + 1e-6)
+            target = steps[min(i, len(steps) - 1)]
+        else:
+            i = bisect.bisect_left(steps, current - 1e-6) - 1
+            target = steps[max(i, 0)]
+        # set_zoom_signal brings MainWindow's current zoom up to date
+        pv.set_zoom(target)
+
+    def zoom_in(self):
+        self._zoom_to(+1)
         # self._update_zoom_selector()
 
     def zoom_out(self):
-        pv = getattr(self.ui, 'pdfView', None)
-        pv.zoom_type = 0
-        if hasattr(pv, 'zoom_out'):
-            pv.zoom_out()
-        elif hasattr(pv, 'set_zoom'):
-            current = getattr(pv, 'zoom_level', 1.0)
-            pv.set_zoom(max(0.25, current * 0.8))
+        self._zoom_to(-1)
         # self._update_zoom_selector()
 
     def fit_to_width(self):
@@ -959,9 +973,7 @@ class ActionsHandler:
         delete_after = dialog.is_delete_after_export()
 
         last_dir = settings_manager.get_last_directory()
-        doc_basename = os.path.splitext(
-            os.path.basename(getattr(self.main_window, 'current_document_path', '') or 'document')
-        )[0]
+        doc_basename = self.main_window.default_export_basename()
 
         # -- Ask for output folder
         output_dir = QFileDialog.getExistingDirectory(
@@ -1419,8 +1431,8 @@ class ActionsHandler:
                     else:
                         self.main_window.is_document_modified = True
 
-                    if hasattr(self.main_window, 'update_ui_state'):
-                        self.main_window.update_ui_state()
+                    if hasattr(self.main_window, 'schedule_ui_update'):
+                        self.main_window.schedule_ui_update()
                     if hasattr(self.main_window, 'update_window_title'):
                         self.main_window.update_window_title()
 
@@ -1723,10 +1735,8 @@ class ActionsHandler:
                     self.main_window.on_document_modified(True)
                 else:
                     self.main_window.is_document_modified = True
-                if hasattr(self.main_window, 'update_page_info'):
-                    self.main_window.update_page_info()
-                if hasattr(self.main_window, 'update_ui_state'):
-                    self.main_window.update_ui_state()
+                if hasattr(self.main_window, 'schedule_ui_update'):
+                    self.main_window.schedule_ui_update()
                 if hasattr(self.main_window, 'update_window_title'):
                     self.main_window.update_window_title()
 
@@ -1742,6 +1752,8 @@ class ActionsHandler:
         pv = getattr(self.ui, 'pdfView', None)
         method = 'rotate_page_clockwise' if delta > 0 else 'rotate_page_counterclockwise'
         success = False
+        # Capture before rotating: the viewer re-lays out pages afterwards
+        current_page = pv.get_current_page()
         if hasattr(pv, method):
             try:
                 success = bool(getattr(pv, method)())
@@ -1758,5 +1770,9 @@ class ActionsHandler:
                 self.main_window.on_document_modified(True)
             else:
                 self.main_window.is_document_modified = True
-            # Update corresponding thumbnail preview if supported
-            self.ui.thumbnailList.refresh_thumbnails(pv.document)
+            # Rotate only the affected thumbnail instead of rebuilding the list
+            thumb = self.ui.thumbnailList
+            if hasattr(thumb, 'rotate_page_thumbnail'):
+                thumb.rotate_page_thumbnail(current_page, delta)
+            else:
+                thumb.refresh_thumbnails(pv.document)
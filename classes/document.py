@@ -13,17 +13,23 @@ class PageInfo:
 
 
 class Document:
-    def __init__(self, file_path: str = None):
+    def __init__(self, file_path: str = None, fitz_doc: fitz.Document = None):
         self.file_path = file_path
+        # fitz_doc: an already opened (e.g. authenticated) handle to take ownership of
+        if fitz_doc is not None:
+            self.current_doc = fitz_doc
+            return
         try:
             self.current_doc = fitz.open(file_path)
 
         except Exception as e:
             print(f"Error open document: {e}")
 
-    def auth(self, password: str):
+    def auth(self, password: str) -> bool:
         if not self.current_doc.authenticate(password):
             self.close()
+            return False
+        return True
 
     def get_page_count(self) -> int:
         return self.current_doc.page_count
@@ -57,7 +63,8 @@ class Document:
         return rect.width, rect.height
 
     def need_auth(self) -> bool:
-        return self.current_doc.needs_pass
+        # needs_pass stays set after a successful authenticate(); is_encrypted is cleared
+        return bool(self.current_doc.needs_pass) and self.current_doc.is_encrypted
 
     def new_page(self, in_width: float, in_height: float) -> Page:
         if self.current_doc:
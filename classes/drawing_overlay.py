@@ -1,6 +1,6 @@
 from PySide6.QtWidgets import QWidget
-from PySide6.QtGui import QPainter, QPen, QColor, QPixmap, QMouseEvent, QPaintEvent, QKeyEvent
-from PySide6.QtCore import Qt, QRect, QPoint, QBuffer, Signal, QSize
+from PySide6.QtGui import QPainter, QPen, QColor, QPixmap, QImage, QMouseEvent, QPaintEvent, QKeyEvent, qRgba
+from PySide6.QtCore import Qt, QRect, QRectF, QPoint, QBuffer, Signal, QSize, QTimer
 
 
 class DrawingOverlay(QWidget):
@@ -38,6 +38,14 @@ class DrawingOverlay(QWidget):
         self.annot_pixmap = QPixmap(1, 1)
         self.annot_pixmap.fill(Qt.transparent)
 
+        # Backing store with the committed primitives already rasterized at
+        # widget size; rebuilt only when the primitive list or size changes.
+        # Single-colour annotations are kept as an 8-bit indexed QImage
+        # (alpha ramp palette) instead of a 32-bit QPixmap.
+        self._committed_pixmap: QPixmap | QImage | None = None
+        self._committed_key = None
+        self._color_tables: dict[tuple, list[int]] = {}
+
         self.tool  = self.TOOL_BRUSH
         self.color = QColor(Qt.black)
         self.brush_size = 4
@@ -56,6 +64,13 @@ class DrawingOverlay(QWidget):
         self._dirty         = False
         self.enabled        = False
 
+        # annotation_changed is coalesced: bursts of edits (fast marking,
+        # key-repeat undo) reach the listeners as a single emission.
+        self._emit_timer = QTimer(self)
+        self._emit_timer.setSingleShot(True)
+        self._emit_timer.setInterval(50)
+        self._emit_timer.timeout.connect(self._emit_annotation_changed)
+
         self.setAttribute(Qt.WA_TransparentForMouseEvents, True)
         self.setAttribute(Qt.WA_NoSystemBackground, True)
         self.setAttribute(Qt.WA_StaticContents, True)
@@ -110,10 +125,7 @@ class DrawingOverlay(QWidget):
         self._redo_stack.append(self.primitives.pop())
         self._dirty = bool(self.primitives)
         self.update()
-        try:
-            self.annotation_changed.emit()
-        except Exception:
-            pass
+        self._emit_timer.start()
 
     def redo(self):
         if not self._redo_stack:
@@ -121,23 +133,32 @@ class DrawingOverlay(QWidget):
         self.primitives.append(self._redo_stack.pop())
         self._dirty = True
         self.update()
-        try:
-            self.annotation_changed.emit()
-        except Exception:
-            pass
+        self._emit_timer.start()
 
     def clear_annotations(self, emit: bool = True):
         self.primitives.clear()
         self._redo_stack.clear()
         self.annot_pixmap = QPixmap(1, 1)
         self.annot_pixmap.fill(Qt.transparent)
+        self._committed_pixmap = None
+        self._committed_key = None
         self._dirty = False
         self.update()
+        self._emit_timer.stop()
         if emit:
-            try:
-                self.annotation_changed.emit()
-            except Exception:
-                pass
+            self._emit_annotation_changed()
+
+    def _emit_annotation_changed(self):
+        try:
+            self.annotation_changed.emit()
+        except Exception:
+            pass
+
+    def flush_pending_emit(self):
+        """Deliver a pending annotation_changed right away (call before saving)."""
+        if self._emit_timer.isActive():
+            self._emit_timer.stop()
+            self._emit_annotation_changed()
 
     def is_dirty(self) -> bool:
         return bool(self._dirty)
@@ -145,6 +166,10 @@ class DrawingOverlay(QWidget):
     def has_vector(self) -> bool:
         return bool(self.primitives)
 
+    def is_empty(self) -> bool:
+        """Nothing drawn, nothing to redo and nothing pending"""
+        return not (self.primitives or self._redo_stack or self._dirty)
+
     def get_vector_shapes(self) -> dict:
         """Возвращают dict в старом формате с overlay_render / save."""
         return {
@@ -156,12 +181,22 @@ class DrawingOverlay(QWidget):
         try:
             if target_width <= 0 or target_height <= 0:
                 return b""
-            pm = QPixmap(QSize(target_width, target_height))
-            pm.fill(Qt.transparent)
-            p = QPainter(pm)
-            p.setRenderHint(QPainter.Antialiasing)
-            self._paint_primitives(p, target_width, target_height)
-            p.end()
+            committed = self._committed_pixmap
+            if (committed is not None
+                    and self._committed_key == self._committed_cache_key(max(1, self.width()), max(1, self.height()))
+                    and committed.width() >= target_width
+                    and committed.height() >= target_height):
+                # Downscaling the backing store is a single Qt call; only
+                # replay vectors when it would have to be upscaled.
+                pm = committed.scaled(target_width, target_height,
+                                      Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            else:
+                pm = QPixmap(QSize(target_width, target_height))
+                pm.fill(Qt.transparent)
+                p = QPainter(pm)
+                p.setRenderHint(QPainter.Antialiasing)
+                self._paint_primitives(p, target_width, target_height)
+                p.end()
             buf = QBuffer()
             buf.open(QBuffer.ReadWrite)
             pm.save(buf, "PNG")
@@ -177,14 +212,29 @@ class DrawingOverlay(QWidget):
                           extra_stroke: list | None = None,
                           extra_rect: QRect | None = None):
         """Draw all committed primitives in order, then any in-progress preview."""
+        # Consecutive rects with identical style are collected here and
+        # flushed with a single drawRects() call (keeps z-order intact).
+        rect_batch: list[QRectF] = []
+        batch_style = None
+
+        def flush_rects():
+            if not rect_batch:
+                return
+            fill_raw, border_raw, border_w, opacity = batch_style
+            painter.setOpacity(opacity / 255.0)
+            painter.setBrush(QColor(*fill_raw) if fill_raw is not None else Qt.NoBrush)
+            painter.setPen(QPen(QColor(*border_raw), border_w) if border_w > 0 else Qt.NoPen)
+            painter.drawRects(rect_batch)
+            rect_batch.clear()
+
         for prim in self.primitives:
             kind = prim.get("kind")
             opacity = prim.get("opacity", 255)
-            painter.setOpacity(opacity / 255.0)
             if kind == "stroke":
                 pts = prim.get("points", [])
                 if len(pts) < 2:
                     continue
+                flush_rects()
                 # Render onto offscreen pixmap to avoid per-segment opacity accumulation
                 tmp = QPixmap(w, h)
                 tmp.fill(Qt.transparent)
@@ -195,31 +245,37 @@ class DrawingOverlay(QWidget):
                            Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
                 tmp_p.setPen(pen)
                 tmp_p.setBrush(Qt.NoBrush)
-                prev = None
-                for nx, ny in pts:
+                draw_line = tmp_p.drawLine
+                it = iter(pts)
+                nx, ny = next(it)
+                prev_x, prev_y = nx * w, ny * h
+                for nx, ny in it:
                     x, y = nx * w, ny * h
-                    if prev is None:
-                        prev = (x, y)
-                    else:
-                        tmp_p.drawLine(prev[0], prev[1], x, y)
-                        prev = (x, y)
+                    draw_line(prev_x, prev_y, x, y)
+                    prev_x, prev_y = x, y
                 tmp_p.end()
                 painter.setOpacity(opacity / 255.0)
                 painter.drawPixmap(0, 0, tmp)
                 painter.setOpacity(1.0)
             elif kind == "rect":
                 x0, y0, x1, y1 = prim.get("rect", (0, 0, 0, 0))
-                rx, ry = x0 * w, y0 * h
-                rw, rh = (x1 - x0) * w, (y1 - y0) * h
-                fill_raw   = prim.get("fill_color")
-                border_raw = prim.get("border_color", (0, 0, 0))
-                border_w   = prim.get("border_width", 0)
-                painter.setBrush(QColor(*fill_raw) if fill_raw is not None else Qt.NoBrush)
-                painter.setPen(QPen(QColor(*border_raw), border_w) if border_w > 0 else Qt.NoPen)
-                painter.drawRect(rx, ry, rw, rh)
+                style = (prim.get("fill_color"),
+                         prim.get("border_color", (0, 0, 0)),
+                         prim.get("border_width", 0),
+                         opacity)
+                if style != batch_style:
+                    flush_rects()
+                    batch_style = style
+                rect_batch.append(QRectF(x0 * w, y0 * h, (x1 - x0) * w, (y1 - y0) * h))
+        flush_rects()
         painter.setOpacity(1.0)  # restore
 
-        # ── In-progress preview ──────────────────────────────────────────
+        self._paint_preview(painter, w, h, extra_stroke, extra_rect)
+
+    def _paint_preview(self, painter: QPainter, w: int, h: int,
+                       extra_stroke: list | None = None,
+                       extra_rect: QRect | None = None):
+        """Draw the in-progress stroke / rect on top of the committed primitives."""
         if extra_stroke and len(extra_stroke) >= 2:
             # Render stroke onto offscreen pixmap first, then composite with opacity.
             # This prevents segment-by-segment opacity accumulation.
@@ -231,16 +287,17 @@ class DrawingOverlay(QWidget):
                        Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
             tmp_painter.setPen(pen)
             tmp_painter.setBrush(Qt.NoBrush)
+            draw_line = tmp_painter.drawLine
             prev = extra_stroke[0]
             for pt in extra_stroke[1:]:
-                tmp_painter.drawLine(prev, pt)
+                draw_line(prev, pt)
                 prev = pt
             tmp_painter.end()
             painter.setOpacity(self.brush_opacity / 255.0)
             painter.drawPixmap(0, 0, tmp)
             painter.setOpacity(1.0)
 
-        if extra_rect and not extra_rect.isNull():
+        if extra_rect is not None and not extra_rect.isNull():
             painter.setOpacity(self.rect_opacity / 255.0)
             fill_raw = (self._color_to_tuple(self.rect_fill_color)
                         if self.rect_fill_color is not None else None)
@@ -252,10 +309,73 @@ class DrawingOverlay(QWidget):
             painter.drawRect(extra_rect)
             painter.setOpacity(1.0)
 
+    def _committed_cache_key(self, w: int, h: int):
+        prims = self.primitives
+        # The store is allocated in device pixels: moving to a screen with another DPR invalidates it
+        return (w, h, self.devicePixelRatioF(), len(prims), id(prims[-1]) if prims else None)
+
+    def _single_color(self) -> "tuple | None":
+        """Return the only RGB colour used by the committed primitives, or None if several are used."""
+        color = None
+        for prim in self.primitives:
+            if prim.get("kind") == "stroke":
+                used = (prim.get("color", (0, 0, 0)),)
+            else:
+                used = (prim.get("fill_color"),
+                        prim.get("border_color", (0, 0, 0)) if prim.get("border_width", 0) > 0 else None)
+            for c in used:
+                if c is None:
+                    continue
+                c = tuple(c)
+                if color is None:
+                    color = c
+                elif c != color:
+                    return None
+        return color or (0, 0, 0)
+
+    def _alpha_color_table(self, color: tuple) -> list:
+        table = self._color_tables.get(color)
+        if table is None:
+            r, g, b = color[:3]
+            table = [qRgba(r, g, b, a) for a in range(256)]
+            self._color_tables[color] = table
+        return table
+
+    def _get_committed_pixmap(self, w: int, h: int) -> "QPixmap | QImage | None":
+        """Return the backing store for the committed primitives, rebuilding it if stale."""
+        if not self.primitives:
+            self._committed_pixmap = None
+            self._committed_key = None
+            return None
+        key = self._committed_cache_key(w, h)
+        if self._committed_pixmap is None or self._committed_key != key:
+            dpr = self.devicePixelRatioF()
+            mono = self._single_color()
+            if mono is not None:
+                # Only coverage matters: paint into Alpha8, then read the same
+                # bytes back as Indexed8 through a colour-with-alpha palette.
+                store = QImage(int(w * dpr), int(h * dpr), QImage.Format_Alpha8)
+                store.fill(0)
+            else:
+                store = QPixmap(int(w * dpr), int(h * dpr))
+                store.fill(Qt.transparent)
+            store.setDevicePixelRatio(dpr)
+            p = QPainter(store)
+            p.setRenderHint(QPainter.Antialiasing)
+            self._paint_primitives(p, w, h)
+            p.end()
+            if mono is not None:
+                store.reinterpretAsFormat(QImage.Format_Indexed8)
+                store.setColorTable(self._alpha_color_table(mono))
+            self._committed_pixmap = store
+            self._committed_key = key
+        return self._committed_pixmap
+
     # ── Helpers ────────────────────────────────────────────────────────
     def _to_normalized(self, pt: QPoint):
-        return (pt.x() / max(1, self.width()),
-                pt.y() / max(1, self.height()))
+        w = self.width() or 1
+        h = self.height() or 1
+        return (pt.x() / w, pt.y() / h)
 
     def _color_to_tuple(self, color: QColor):
         return (color.red(), color.green(), color.blue())
@@ -300,7 +420,7 @@ class DrawingOverlay(QWidget):
         # Any new stroke clears the redo stack (standard UX)
         self._redo_stack.clear()
         self._drawing = True
-        p = ev.position().toPoint() if hasattr(ev, "position") else ev.pos()
+        p = ev.position().toPoint()
         if self.tool == self.TOOL_BRUSH:
             self._current_stroke = [p]
         else:
@@ -311,7 +431,7 @@ class DrawingOverlay(QWidget):
     def mouseMoveEvent(self, ev: QMouseEvent):
         if not self.enabled or not self._drawing:
             return
-        p = ev.position().toPoint() if hasattr(ev, "position") else ev.pos()
+        p = ev.position().toPoint()
         if self.tool == self.TOOL_BRUSH:
             self._current_stroke.append(p)
         else:
@@ -322,10 +442,12 @@ class DrawingOverlay(QWidget):
     def mouseReleaseEvent(self, ev: QMouseEvent):
         if not self.enabled or not self._drawing:
             return
-        p = ev.position().toPoint() if hasattr(ev, "position") else ev.pos()
+        p = ev.position().toPoint()
 
         if self.tool == self.TOOL_BRUSH:
-            normalized = [self._to_normalized(pt) for pt in self._current_stroke]
+            w = max(1, self.width())
+            h = max(1, self.height())
+            normalized = [(pt.x() / w, pt.y() / h) for pt in self._current_stroke]
             if len(normalized) >= 2:
                 self.primitives.append({
                     "kind":    "stroke",
@@ -358,10 +480,7 @@ class DrawingOverlay(QWidget):
         self._drawing = False
         self._dirty   = True
         self.update()
-        try:
-            self.annotation_changed.emit()
-        except Exception:
-            pass
+        self._emit_timer.start()
         ev.accept()
 
     # ── Paint ─────────────────────────────────────────────────────────
@@ -372,11 +491,16 @@ class DrawingOverlay(QWidget):
 
             w, h = max(1, self.width()), max(1, self.height())
 
-            self._paint_primitives(
-                painter, w, h,
-                extra_stroke = self._current_stroke if self._drawing and self.tool == self.TOOL_BRUSH else None,
-                extra_rect   = self._rect_current   if self._drawing and self.tool == self.TOOL_RECT  else None,
-            )
+            committed = self._get_committed_pixmap(w, h)
+            if isinstance(committed, QImage):
+                painter.drawImage(0, 0, committed)
+            elif committed is not None:
+                painter.drawPixmap(0, 0, committed)
+            if self._drawing:
+                if self.tool == self.TOOL_BRUSH:
+                    self._paint_preview(painter, w, h, extra_stroke=self._current_stroke)
+                else:
+                    self._paint_preview(painter, w, h, extra_rect=self._rect_current)
             painter.end()
         except Exception as e:
             print(f"[DrawingOverlay] paintEvent error: {e}")
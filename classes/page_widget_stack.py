@@ -1,4 +1,5 @@
 import gc
+import logging
 import math
 
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QSpacerItem, QSizePolicy
@@ -9,6 +10,9 @@ from classes.vector_manager import VectorManager
 from classes.page_widget import PageWidget
 from classes.mapPage import MapPage
 
+# Scroll/relayout tracing; silent unless DEBUG is enabled
+log = logging.getLogger(__name__)
+
 
 class PageWidgetStack(QVBoxLayout):
 
@@ -192,7 +196,7 @@ class PageWidgetStack(QVBoxLayout):
             self.spacer = QSpacerItem(0, height, QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
             self.insertSpacerItem(0, self.spacer)
             self.isSpacer = True
-            print(f"Added spacer height: {height}")
+            log.debug("Added spacer height: %s", height)
         except Exception as e:
             raise Exception(f"Ошибка при добавлении пространства: {e}")
 
@@ -284,7 +288,7 @@ class PageWidgetStack(QVBoxLayout):
 
         indexInList = self.page_widgets.index(widget)
 
-        print(f"index in List: {indexInList}")
+        log.debug("index in List: %s", indexInList)
 
         if indexInList == -1:
             return False
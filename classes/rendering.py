@@ -4,9 +4,9 @@ from pymupdf import Page
 
 from classes.document import Document
 from PySide6.QtCore import (
-    Qt, QRunnable, QThreadPool, QTimer, Signal, QSize
+    Qt, QObject, QRunnable, QThreadPool, QTimer, Signal, QSize
 )
-from PySide6.QtGui import QPixmap
+from PySide6.QtGui import QPixmap, QImage
 
 
 class PageRenderWorker(QRunnable):
@@ -81,3 +81,104 @@ class PageRenderWorker(QRunnable):
         except Exception as e:
             if not self.cancelled:
                 print(f"Error rendering page {self.page_num}: {e}")
+
+
+class DocumentLoadSignals(QObject):
+    """Signals for DocumentLoadWorker (QRunnable itself cannot emit)"""
+    # file_path, Document or None, list[PageInfo] or None, error message
+    finished = Signal(str, object, object, str)
+    # file_path, pages done, total pages (page-geometry pass)
+    progress = Signal(str, int, int)
+
+
+class DocumentLoadWorker(QRunnable):
+    """Open a PDF and collect its page geometry off the GUI thread.
+
+    Widget creation still has to happen on the GUI thread, so the opened
+    Document is handed back through `signals.finished` and installed there.
+    An encrypted document is unlocked with `password` if one is given;
+    page info is only collected for documents that end up unlocked.
+    `document` resumes a handle that is already open (e.g. still locked
+    after a failed first attempt) instead of parsing the file again.
+    """
+
+    def __init__(self, file_path: str, password: str = None, document: Document = None):
+        super().__init__()
+        self.file_path = file_path
+        self.password = password
+        self.document = document
+        self.signals = DocumentLoadSignals()
+
+    def run(self):
+        document = None
+        pages_info = None
+        error = ""
+        try:
+            document = self.document if self.document is not None else Document(self.file_path)
+            if getattr(document, "current_doc", None) is None:
+                document = None
+                error = f"Cannot open {self.file_path}"
+            elif document.need_auth() and self.password:
+                # authenticate() directly: Document.auth() would close the handle on failure
+                document.current_doc.authenticate(self.password)
+            if document is not None and not document.need_auth():
+                total = document.get_page_count()
+                # Report about 50 steps, not every page: each emit is a queued event
+                step = max(1, total // 50)
+                pages_info = []
+                for i in range(total):
+                    pages_info.append(document.get_page_info(i))
+                    if i % step == 0:
+                        self.signals.progress.emit(self.file_path, i, total)
+        except Exception as e:
+            error = str(e)
+            print(f"Error loading document {self.file_path}: {e}")
+        self.signals.finished.emit(self.file_path, document, pages_info, error)
+
+
+class ThumbnailRenderSignals(QObject):
+    """Signals for ThumbnailRenderWorker (QRunnable itself cannot emit)"""
+    # original page number, worker token, rendered image (null on failure)
+    finished = Signal(int, int, QImage)
+
+
+class ThumbnailRenderWorker(QRunnable):
+    """Render one thumbnail off the GUI thread.
+
+    The page is rendered straight at thumbnail scale and handed back as a
+    QImage; the QPixmap is created on the GUI thread. `token` lets the
+    receiver drop results of renders it no longer wants.
+    """
+
+    def __init__(self, page: Page, page_num: int, size: int, token: int, signals: ThumbnailRenderSignals):
+        super().__init__()
+        self.page = page
+        self.page_num = page_num  # ORIGINAL document page index
+        self.size = size
+        self.token = token
+        self.signals = signals
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    @staticmethod
+    def render_image(page: Page, size: int) -> QImage:
+        """Render page to fit a size x size box"""
+        rect = page.rect
+        scale = min(size / rect.width, size / rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False, colorspace=fitz.csRGB)
+        # Wrap the RGB samples directly instead of a PPM encode/decode round trip;
+        # copy() detaches the image from the fitz buffer before pix is freed
+        return QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).copy()
+
+    def run(self):
+        if self.cancelled:
+            return
+        image = QImage()
+        try:
+            image = self.render_image(self.page, self.size)
+        except Exception as e:
+            print(f"Error rendering thumbnail for page {self.page_num}: {e}")
+        if not self.cancelled:
+            self.signals.finished.emit(self.page_num, self.token, image)
@@ -1,3 +1,4 @@
+import logging
 import os
 import sys
 
@@ -112,19 +113,12 @@ def setup_application():
 
 
 def get_system_language():
-    """Get system language for localization"""
-    locale = QLocale.system()
-    language = locale.name()
+    """Get language for localization.
 
-    language = 'ru'  # Overwritten for personal purposes
-
-    # Map system locales to our supported languages
-    if language.startswith('ru'):
-        return 'ru-RU'
-    elif language.startswith('en'):
-        return 'en-US'
-    else:
-        return 'ru-RU'  # Default to Russian
+    The UI is Russian-only for now (the system locale used to be read and
+    then overwritten with 'ru'), so skip the QLocale.system() lookup.
+    """
+    return 'ru-RU'
 
 
 def main():
@@ -134,22 +128,17 @@ def main():
         # modifies the list in-place (PySide6 strips Qt-recognised flags).
         launch_args = sys.argv[:]
 
+        # Debug diagnostics stay silent unless the level is lowered here
+        logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
         # Create application
         app = setup_application()
 
         # Determine language
         language = get_system_language()
 
-        # Create and show main window
-        window = MainWindow()
-
-        # Apply localization
-        try:
-            import ui_localization
-            ui_localization.translate_ui(window.ui, window, language)
-            ui_localization.shortcuts_ui(window.ui)
-        except ImportError:
-            print("Warning: Could not load localization")
+        # Create and show main window (setup_ui localizes it in a single pass)
+        window = MainWindow(language)
 
         window.show()
 
@@ -1,17 +1,24 @@
+import gc
+import logging
 import os
 
-from PySide6.QtCore import QEvent, Qt
-from PySide6.QtGui import QDragEnterEvent, QDropEvent
+from PySide6.QtCore import QCoreApplication, QEvent, Qt, QTimer, Slot, QModelIndex, QPoint, QThreadPool
+from PySide6.QtGui import QColor, QDragEnterEvent, QDropEvent, QIcon, QIntValidator
 from PySide6.QtPdf import QPdfBookmarkModel
 from PySide6.QtWidgets import (
-    QMainWindow, QMessageBox, QInputDialog, QMenu
+    QMainWindow, QMessageBox, QInputDialog, QLineEdit, QMenu, QColorDialog, QProgressBar
 )
 from PySide6.QtGui import QShortcut, QKeySequence
 
+# Diagnostics go through logging so the messages (and their formatting) cost
+# nothing unless DEBUG is enabled; main_entry configures the root at WARNING
+log = logging.getLogger(__name__)
+
 # Single source of truth for the application name used in window titles
 APP_NAME = "Редактор PDF Альт"
 
 from actions_handler import ActionsHandler
+from classes.rendering import DocumentLoadWorker
 from pdf_viewer import PDFViewer
 from settings_manager import settings_manager
 from thumbnail_widget import ThumbnailContainerWidget, ThumbnailInfo
@@ -23,26 +30,113 @@ class MainWindow(QMainWindow):
     Main window that combines the old UI design with efficient PDF handling.
     """
 
-    def __init__(self):
+    # Splitter layout: tab buttons column | side panel content | PDF view
+    TAB_BUTTONS_WIDTH = 25
+    MIN_PANEL_WIDTH = 150
+    MAX_PANEL_WIDTH = 300
+    MIN_PDF_VIEW_WIDTH = 400
+
+    def __init__(self, language: str = "en"):
         super().__init__()
 
-        # UI setup
+        # UI setup (texts and shortcuts are applied here, in the given language)
         self.ui = UiMainWindow()
-        self.ui.setup_ui(self, "en")
+        self.ui.setup_ui(self, language)
 
         # Document state
         self.current_document_path = ""
+        # os.path.basename(current_document_path), refreshed whenever the path changes
+        self._current_basename = ""
         self.is_document_modified = False
+        # Path of the background load whose result is still awaited
+        self._load_request_path = None
+        self._load_worker = None
+        # Path whose password-dialog retry is running / already done (one retry per load_document)
+        self._password_retry_path = None
+        # cleanup_before_close already ran (it is deferred to aboutToQuit)
+        self._cleaned_up = False
+        # Last string passed to setWindowTitle (see _set_title)
+        self._last_title = ""
+        # Mirror of pdfView.zoom_level, kept in sync via set_zoom_signal
+        self._current_zoom = 1.0
+        # Display-number index over non-deleted pages, rebuilt on pdfView.layout_changed:
+        # _display_order[display - 1] -> layout index, _display_by_page[orig page] -> display
+        self._display_order = []
+        self._display_by_page = {}
+        # Original page number -> layout index (same rebuild)
+        self._original_to_layout = {}
+        # Last page_changed value handled; reset on relayout so labels refresh
+        self._last_page_signal = -1
+        # Thumbnail highlight: page requested by page_changed / page last applied
+        self._pending_thumb_page = -1
+        self._last_thumb_page = -1
+        # Status bar progress bar for background loads, created on first use
+        self._load_progress = None
+        # "Save changes?" dialog and its buttons, created on first use (ask_save_changes)
+        self._save_changes_box = None
+        # Set while on_action_draw_toggled commits overlays (each page re-emits document_modified)
+        self._draw_toggle_in_progress = False
+        # Path currently loaded into ui.m_document (bookmarks), loaded on demand
+        self._bookmarks_loaded_for = None
+        # Window/panel state changed since startup (see save_window_settings);
+        # tracking starts once the initial show/restore events have been processed
+        self._geometry_dirty = False
+        self._geometry_tracking = False
+        # Zoom as stored in the settings; fit modes change the zoom on every load, so
+        # it is compared on close instead of marking the geometry dirty
+        self._saved_zoom = None
+        # (panel_visible, panel_width) from settings, applied to the splitter on first show
+        self._pending_panel_state = None
+
+        # Coalesces update_ui_state/update_page_info bursts (repeated moves,
+        # rotations, modification signals) into one refresh per 30 ms window
+        self._ui_update_timer = QTimer(self)
+        self._ui_update_timer.setSingleShot(True)
+        self._ui_update_timer.setInterval(30)
+        self._ui_update_timer.timeout.connect(self._flush_ui_updates)
+
+        # Enter in the page field is debounced so repeated/auto-repeat
+        # submissions trigger a single navigation
+        self._page_input_timer = QTimer(self)
+        self._page_input_timer.setSingleShot(True)
+        self._page_input_timer.setInterval(50)
+        self._page_input_timer.timeout.connect(self.go_to_page_input)
+
+        # Zoom selector changes are applied at most once per frame (_apply_pending_zoom)
+        self._pending_zoom = None
+        self._zoom_timer = QTimer(self)
+        self._zoom_timer.setSingleShot(True)
+        self._zoom_timer.setInterval(16)
+        self._zoom_timer.timeout.connect(self._apply_pending_zoom)
+
+        # Page label/status text is refreshed at most once per frame while scrolling
+        self._page_info_timer = QTimer(self)
+        self._page_info_timer.setSingleShot(True)
+        self._page_info_timer.setInterval(16)
+        self._page_info_timer.timeout.connect(self._do_update_page_info)
 
         # Setup PDF components - the UI already creates PDFViewer instances
         self.setup_pdf_components()
 
+        # setup_pdf_components guarantees a PDFViewer and a ThumbnailContainerWidget,
+        # so their methods (and the UI's widgets) are called directly, without probing
+        self._pdf_view = self.ui.pdfView
+        self._thumb = self.ui.thumbnailList
+        # Created by the UI setup
+        self._status_bar = self.statusBar()
+        # (page, total, chunk, chunks) last shown by _do_update_page_info and the status text built for it
+        self._last_page_info = None
+        self._last_page_status = ""
+
         # Setup actions handler
         self.actions_handler = ActionsHandler(self)
 
         # Connect UI signals
         self.connect_signals()
 
+        # Actions toggled by update_ui_state, resolved once
+        self._build_action_groups()
+
         # Enable drag and drop
         self.setAcceptDrops(True)
 
@@ -51,14 +145,14 @@ class MainWindow(QMainWindow):
         self.update_ui_state()
 
         # Window settings
-        self.setWindowTitle(APP_NAME)
+        self._set_title(APP_NAME)
 
     def setup_pdf_components(self):
         """Setup PDF viewer and thumbnail components"""
         # PDF viewer should already be created by updated_ui_main_window.py
         if not hasattr(self.ui, 'pdfView') or not isinstance(self.ui.pdfView, PDFViewer):
             # Fallback: create new PDF viewer if not found
-            print("Warning: PDFViewer not found in UI, creating new one")
+            log.warning("PDFViewer not found in UI, creating new one")
             self.ui.pdfView = PDFViewer()
 
             # Try to add it to the splitter if it exists
@@ -70,87 +164,114 @@ class MainWindow(QMainWindow):
             self.thumbnail_widget = self.ui.thumbnailList
         else:
             # Fallback: create new thumbnail widget if not found
-            print("Warning: ThumbnailContainerWidget not found in UI, creating new one")
+            log.warning("ThumbnailContainerWidget not found in UI, creating new one")
             self.thumbnail_widget = ThumbnailContainerWidget()
             self.ui.thumbnailList = self.thumbnail_widget
 
+        # Recent thumbnails stay decoded, older ones are kept PNG-compressed
+        self.thumbnail_widget.set_cache_policy(max_live=64, max_compressed=512)
+        # Thumbnails render on the viewer's pool, behind page renders; close_document's
+        # waitForDone() then also covers them before the document is closed
+        render_pool = getattr(self.ui.pdfView, 'thread_pool', None)
+        if render_pool is not None:
+            self.thumbnail_widget.set_render_pool(render_pool)
+
     def load_window_settings(self):
         """Load window settings from settings manager"""
-        size, position, maximized = settings_manager.load_window_state()
+        settings = settings_manager.load_all()
+        self._saved_zoom = settings_manager.get_zoom_level()
+        size = settings["size"]
 
         self.resize(size)
-        self.move(position)
+        self.move(settings["position"])
 
-        if maximized:
+        if settings["maximized"]:
             self.showMaximized()
 
         # Load panel state
-        panel_visible, panel_width, active_tab = settings_manager.load_panel_state()
+        panel_visible = settings["panel_visible"]
+        panel_width = settings["panel_width"]
+        active_tab = settings["active_tab"]
+
+        # Optional UI parts, looked up once
+        ui = self.ui
+        side_panel = getattr(ui, 'sidePanelContent', None)
+        splitter = getattr(ui, 'splitter', None)
+        pages_button = getattr(ui, 'pagesButton', None)
+        bookmarks_button = getattr(ui, 'bookmarksButton', None)
 
         # Set panel visibility and enforce size constraints
-        if hasattr(self.ui, 'sidePanelContent') and hasattr(self.ui, 'splitter'):
-            self.ui.sidePanelContent.setVisible(panel_visible)
+        if side_panel is not None and splitter is not None:
+            side_panel.setVisible(panel_visible)
 
             if panel_visible:
-                # Enforce minimum/maximum panel width constraints
-                min_panel_width = 150
-                max_panel_width = 300  # Maximum allowed width
-                constrained_width = max(min_panel_width, min(panel_width, max_panel_width))
-
-                # Set the splitter sizes - tab buttons (25px) + content width + remaining for PDF view
-                tab_buttons_width = 25
-                total_sidebar_width = tab_buttons_width + constrained_width
-                pdf_view_width = max(400, self.width() - total_sidebar_width - 25)  # Minimum 400px for PDF view
-
-                splitter_sizes = [tab_buttons_width, constrained_width, pdf_view_width]
-                self.ui.splitter.setSizes(splitter_sizes)
-
                 # Set minimum and maximum sizes for the side panel content
-                self.ui.sidePanelContent.setMinimumWidth(min_panel_width)
-                self.ui.sidePanelContent.setMaximumWidth(max_panel_width)
-            else:
-                # When panel is hidden, give all space to PDF view
-                self.ui.splitter.setSizes([25, 0, self.width() - 25])
+                # (each setter invalidates the layout, so skip the ones already in place)
+                if side_panel.minimumWidth() != self.MIN_PANEL_WIDTH:
+                    side_panel.setMinimumWidth(self.MIN_PANEL_WIDTH)
+                if side_panel.maximumWidth() != self.MAX_PANEL_WIDTH:
+                    side_panel.setMaximumWidth(self.MAX_PANEL_WIDTH)
+
+            # Sized in showEvent, once the real (possibly maximized) width is known
+            self._pending_panel_state = (panel_visible, panel_width)
 
         # Set active tab
-        if hasattr(self.ui, 'pagesButton') and hasattr(self.ui, 'bookmarksButton'):
+        if pages_button is not None and bookmarks_button is not None:
             if active_tab == "bookmarks":
-                self.ui.bookmarksButton.setChecked(True)
-                self.ui.toggle_bookmark_tab()
+                bookmarks_button.setChecked(True)
+                ui.toggle_bookmark_tab()
             else:
-                self.ui.pagesButton.setChecked(True)
-                self.ui.toggle_pages_tab()
+                pages_button.setChecked(True)
+                ui.toggle_pages_tab()
+
+    def _splitter_sizes(self, target_width: int, panel_visible: bool, panel_width: int) -> list:
+        """Splitter sizes for a window target_width wide"""
+        tab_width = self.TAB_BUTTONS_WIDTH
+        if not panel_visible:
+            # When panel is hidden, give all space to PDF view
+            return [tab_width, 0, target_width - tab_width]
+
+        constrained_width = max(self.MIN_PANEL_WIDTH, min(panel_width, self.MAX_PANEL_WIDTH))
+        # Remaining width for the PDF view, minus the same margin as before
+        pdf_view_width = max(self.MIN_PDF_VIEW_WIDTH, target_width - tab_width - constrained_width - 25)
+        return [tab_width, constrained_width, pdf_view_width]
 
     def save_window_settings(self):
         """Save window settings"""
-        settings_manager.save_window_state(
-            self.size(),
-            self.pos(),
-            self.isMaximized()
-        )
-
-        # Save panel state
+        # Panel state
         panel_visible = True
         panel_width = 150  # Default fallback
         active_tab = "pages"
 
-        if hasattr(self.ui, 'sidePanelContent'):
-            panel_visible = self.ui.sidePanelContent.isVisible()
-            if hasattr(self.ui, 'splitter') and panel_visible:
-                sizes = self.ui.splitter.sizes()
+        side_panel = getattr(self.ui, 'sidePanelContent', None)
+        if side_panel is not None:
+            panel_visible = side_panel.isVisible()
+            splitter = getattr(self.ui, 'splitter', None)
+            if splitter is not None and panel_visible:
+                sizes = splitter.sizes()
                 if len(sizes) >= 3:
                     panel_width = sizes[1]  # Second element is sidebar content width
 
-        if hasattr(self.ui, 'bookmarksButton'):
-            if self.ui.bookmarksButton.isChecked():
-                active_tab = "bookmarks"
-
-        settings_manager.save_panel_state(panel_visible, panel_width, active_tab)
+        bookmarks_button = getattr(self.ui, 'bookmarksButton', None)
+        if bookmarks_button is not None and bookmarks_button.isChecked():
+            active_tab = "bookmarks"
+
+        # One pass over QSettings with a single flush
+        settings_manager.save_all({
+            "size": self.size(),
+            "position": self.pos(),
+            "maximized": self.isMaximized(),
+            "panel_visible": panel_visible,
+            "panel_width": panel_width,
+            "active_tab": active_tab,
+            "zoom": self._current_zoom,
+        })
 
         # # Save thumbnail size
         # if hasattr(self.ui.thumbnailList, 'thumbnail_size'):
         #     settings_manager.save_thumbnail_size(self.ui.thumbnailList.thumbnail_size)
 
+    @Slot(QModelIndex)
     def on_bookmark_clicked(self, index):
         """Handle bookmark selection with single click - adapted from old code"""
         if not index.isValid():
@@ -160,43 +281,73 @@ class MainWindow(QMainWindow):
         page = index.data(int(QPdfBookmarkModel.Role.Page))
         zoom_level = index.data(int(QPdfBookmarkModel.Role.Level))
 
-        print(f"Bookmark clicked - Page: {page}, Zoom: {zoom_level}")
+        log.debug("Bookmark clicked - Page: %s, Zoom: %s", page, zoom_level)
 
         if page is not None:
+            pv = self._pdf_view
             # Convert to layout index and navigate
-            layout_index = self.ui.pdfView.layout_index_for_original(page)
+            layout_index = pv.layout_index_for_original(page)
             if layout_index is not None:
-                print(f"Navigating to layout index: {layout_index}")
-                self.ui.pdfView.scroll_to_page(layout_index)
+                log.debug("Navigating to layout index: %s", layout_index)
+                pv.scroll_to_page(layout_index)
             else:
-                print(f"Could not find layout index for original page {page}")
+                log.debug("Could not find layout index for original page %s", page)
 
     def load_bookmarks_document(self, file_path: str):
         """Load the same document into QPdfDocument for bookmarks"""
         if hasattr(self.ui, 'm_document'):
             self.ui.m_document.load(file_path)
 
+    @Slot(bool)
+    def _ensure_bookmarks_loaded(self, checked: bool = True):
+        """Load bookmarks (a second parse of the PDF) only while the bookmarks tab is shown"""
+        if not checked or not self.ui.bookmarksButton.isChecked():
+            return
+        path = self.current_document_path
+        if not path or self._bookmarks_loaded_for == path:
+            return
+        self.load_bookmarks_document(path)
+        self._bookmarks_loaded_for = path
+
     def connect_signals(self):
         """Connect UI signals to their respective handlers"""
 
         # Connect bookmark selection - use clicked for single-click response
         if hasattr(self.ui, 'bookmarkView'):
             self.ui.bookmarkView.clicked.connect(self.on_bookmark_clicked)
-
-        # PDF viewer signals
-        if hasattr(self.ui.pdfView, 'page_changed'):
-            self.ui.pdfView.page_changed.connect(self.on_page_changed)
-        if hasattr(self.ui.pdfView, 'document_modified'):
-            self.ui.pdfView.document_modified.connect(self.on_document_modified)
-        if hasattr(self.ui.pdfView, 'set_zoom'):
-            self.ui.pdfView.set_zoom_signal.connect(self.ui.m_zoomSelector.set_zoom_value)
+        if hasattr(self.ui, 'bookmarksButton'):
+            self.ui.bookmarksButton.toggled.connect(self._ensure_bookmarks_loaded)
+            self.ui.bookmarksButton.toggled.connect(self._mark_geometry_dirty)
+        if hasattr(self.ui, 'pagesButton'):
+            self.ui.pagesButton.toggled.connect(self._mark_geometry_dirty)
+        if hasattr(self.ui, 'splitter'):
+            self.ui.splitter.splitterMoved.connect(self._mark_geometry_dirty)
+
+        # PDF viewer signals (all typed Signal(...) declarations). UniqueConnection keeps a
+        # repeated connect_signals() from stacking duplicate handlers
+        pv = self.ui.pdfView
+        unique = Qt.UniqueConnection
+        if hasattr(pv, 'page_changed'):
+            pv.page_changed.connect(self.on_page_changed, unique)
+        if hasattr(pv, 'document_modified'):
+            pv.document_modified.connect(self.on_document_modified, unique)
+        if hasattr(pv, 'layout_changed'):
+            pv.layout_changed.connect(self._rebuild_display_index, unique)
+        if hasattr(pv, 'set_zoom_signal'):
+            pv.set_zoom_signal.connect(self.ui.m_zoomSelector.set_zoom_value, unique)
+            pv.set_zoom_signal.connect(self._on_viewer_zoom_changed, unique)
 
         # Thumbnail signals
-        if hasattr(self.ui.thumbnailList, 'page_clicked'):
-            self.ui.thumbnailList.page_clicked.connect(self.on_thumbnail_clicked)
-            self.ui.thumbnailList.page_clicked.connect(self.ui.pdfView.scroll_to_page)
+        thumbs = self.ui.thumbnailList
+        if hasattr(thumbs, 'page_clicked'):
+            # on_thumbnail_clicked does the scrolling; a second direct connection to
+            # scroll_to_page made every click navigate twice
+            thumbs.page_clicked.connect(self.on_thumbnail_clicked, unique)
 
         self.ui.m_pageInput.installEventFilter(self)
+        # Only page numbers can be typed; the upper bound follows the document (_rebuild_display_index)
+        self._page_validator = QIntValidator(1, 9_999_999, self)
+        self.ui.m_pageInput.setValidator(self._page_validator)
 
         # Zoom selector
         if hasattr(self.ui, 'm_zoomSelector') and hasattr(self.ui.m_zoomSelector, 'zoom_changed'):
@@ -270,9 +421,9 @@ class MainWindow(QMainWindow):
             if event.type() == QEvent.KeyPress:
                 if event.key() in (Qt.Key_Return, Qt.Key_Enter):
 
-                    has_document = hasattr(self.ui.pdfView, 'document') and self.ui.pdfView.document is not None
+                    has_document = self._pdf_view.document is not None
                     if has_document:
-                        self.go_to_page_input()
+                        self._page_input_timer.start()
                     return True
         return super().eventFilter(obj, event)
 
@@ -291,190 +442,266 @@ class MainWindow(QMainWindow):
                 if not self.actions_handler.save_file():
                     return
 
-        print(f"Loading document: {file_path}")
-
+        log.debug("Loading document: %s", file_path)
+
+        self._password_retry_path = None
+        # A stored password is tried by the worker, so an encrypted file is unlocked
+        # and measured off the GUI thread as well
+        self._start_document_load(file_path, password=settings_manager.get_encryption_password(file_path) or None)
+
+    def _start_document_load(self, file_path: str, password=None, document=None):
+        """Parse/unlock the file and collect page geometry on a worker thread; the
+        viewer/thumbnails are populated in _on_document_loaded on the GUI thread"""
+        self._load_request_path = file_path
+        worker = DocumentLoadWorker(file_path, password=password, document=document)
+        worker.signals.finished.connect(self._on_document_loaded)
+        worker.signals.progress.connect(self._on_document_load_progress)
+        # Keep the worker (and its signals object) alive until the result is in
+        self._load_worker = worker
+        self._set_loading(True)
+        QThreadPool.globalInstance().start(worker)
+
+    def _set_loading(self, loading: bool):
+        """Block document interaction while a background load is running"""
+        self.ui.pdfView.setEnabled(not loading)
+        self.ui.thumbnailList.setEnabled(not loading)
+        if loading:
+            self._show_status("Загрузка документа...")
+            if self._load_progress is None:
+                self._load_progress = QProgressBar(self)
+                self._load_progress.setMaximumWidth(200)
+                self._load_progress.setTextVisible(False)
+                self._status_bar.addPermanentWidget(self._load_progress)
+            # Busy indicator until the worker reports the page count
+            self._load_progress.setRange(0, 0)
+            self._load_progress.show()
+        elif self._load_progress is not None:
+            self._load_progress.hide()
+
+    @Slot(str, int, int)
+    def _on_document_load_progress(self, file_path: str, done: int, total: int):
+        if file_path != self._load_request_path or self._load_progress is None:
+            return
+        self._load_progress.setRange(0, total)
+        self._load_progress.setValue(done)
+
+    @Slot(str, object, object, str)
+    def _on_document_loaded(self, file_path: str, document, pages_info, error: str):
+        if file_path != self._load_request_path:
+            # A newer load_document() superseded this one
+            if document is not None:
+                document.close()
+            return
+        password = self._load_worker.password if self._load_worker is not None else None
+        self._load_request_path = None
+        self._load_worker = None
+        self._set_loading(False)
+        if error:
+            log.warning("Background load failed: %s", error)
+        self._finish_load_document(file_path, document, pages_info, password)
+
+    def _finish_load_document(self, file_path: str, document=None, pages_info=None, password=None):
         # Check if we have a stored password for this file
         stored_password = settings_manager.get_encryption_password(file_path)
 
-        success = False
-        if hasattr(self.ui.pdfView, 'open_document'):
-            print("Attempting to open document with PDF viewer")
-            success = self.ui.pdfView.open_document(file_path)
-            print(f"PDF viewer open result: {success}")
-
-            # If failed but password is stored, retry with password
-            if not success and stored_password:
-                print("Retrying with stored password")
-                try:
-                    import fitz
-                    test_doc = fitz.open(file_path)
-                    if test_doc.is_encrypted and test_doc.authenticate(stored_password):
-                        test_doc.close()
-                        self.ui.pdfView.document_password = stored_password
-                        success = self.ui.pdfView.open_document(file_path)
-                    else:
-                        test_doc.close()
-                        settings_manager.remove_encryption_password(file_path)
-                except Exception as e:
-                    print(f"Password retry failed: {e}")
-
-            if not success:
-                print("Document loading failed, checking if encrypted")
-                success = self.handle_encrypted_document(file_path)
-        else:
-            print("Error: PDF viewer does not have open_document method")
-            success = False
+        log.debug("Attempting to open document with PDF viewer")
+        # The worker has normally unlocked the handle already; otherwise the viewer
+        # tries the password on it again, so the file is parsed once. The viewer does
+        # not prompt: handle_encrypted_document is the only password dialog
+        tried_password = password or stored_password or None
+        success = self._pdf_view.open_document(file_path, preopened_doc=document, pages_info=pages_info,
+                                               password=tried_password, prompt=False)
+        log.debug("PDF viewer open result: %s", success)
+
+        if not success and self._pdf_view.last_open_error == "encrypted":
+            if stored_password and tried_password == stored_password:
+                # The stored password was tried and rejected: the file changed password
+                settings_manager.remove_encryption_password(file_path)
+            # Either unlocking again in the background (_finish_load_document runs again
+            # with the result) or the user cancelled the dialog, which ends the load quietly
+            self.handle_encrypted_document(file_path)
+            return
 
         if success:
-            print("Document loaded successfully")
-            self.current_document_path = file_path
-            filename = os.path.basename(file_path)
-            self.setWindowTitle(f"{APP_NAME} — {filename}")
-
-            # Load document for bookmarks
-            self.load_bookmarks_document(file_path)
-
-            if hasattr(self.ui.thumbnailList, 'set_document'):
-
-                self.ui.thumbnailList.set_document(
-                    getattr(self.ui.pdfView, 'document', None)
-                )
+            log.debug("Document loaded successfully")
+            self.set_current_document(file_path)
+            # open_document resets zoom_level without emitting set_zoom_signal
+            self._current_zoom = self.ui.pdfView.zoom_level
 
-            self.is_document_modified = False
-            self.update_ui_state()
-            self.update_page_info()
-
-            settings_manager.add_recent_file(file_path)
-            if hasattr(self.actions_handler, 'update_recent_files_menu'):
-                self.actions_handler.update_recent_files_menu()
+            # Thumbnails, bookmarks and action states all change here: paint them once
+            self.setUpdatesEnabled(False)
+            try:
+                # Bookmarks are parsed lazily, when the bookmarks tab is shown
+                self._bookmarks_loaded_for = None
+                self._ensure_bookmarks_loaded()
+
+                # Reuse the viewer's page sizes instead of loading every page for its rect;
+                # the file is unmodified, so thumbnails cached on disk for it can be shown
+                self._thumb.set_document(self._pdf_view.document,
+                                         self._pdf_view.page_widget_controller.pages_info,
+                                         file_path=file_path)
+
+                self.is_document_modified = False
+                self.update_ui_state()
+                self.update_page_info()
+            finally:
+                # Re-enabling schedules a single repaint of the window
+                self.setUpdatesEnabled(True)
+
+            # Moves/inserts a single menu entry instead of rebuilding the submenu
+            self.actions_handler.prepend_recent_file(file_path)
+
+            if self._password_retry_path == file_path:
+                self._offer_remember_password(file_path)
         else:
-            print(f"Failed to load document: {file_path}")
+            log.warning("Failed to load document: %s", file_path)
             QMessageBox.critical(
                 self,
                 "Error",
                 f"Failed to open PDF file: {file_path}"
             )
 
-    def handle_encrypted_document(self, file_path: str) -> bool:
-        """Handle encrypted PDF documents"""
-        try:
-            import fitz
-            test_doc = fitz.open(file_path)
+    def handle_encrypted_document(self, file_path: str):
+        """Ask for the password of an encrypted PDF and unlock it in the background.
 
-            if not test_doc.is_encrypted:
-                test_doc.close()
-                return False
+        This is the single password prompt loop of a load: each attempt runs on
+        the load worker and comes back through _on_document_loaded; a rejected
+        password leads here again, a cancel abandons the load.
+        """
+        # Still-encrypted handle from the first attempt: authenticate it instead of re-parsing the file
+        locked = self._pdf_view.take_locked_document()
+        try:
+            if self._password_retry_path == file_path:
+                # The password entered last time was rejected
+                QMessageBox.warning(self, "Authentication Failed", "Invalid password!")
 
             # Ask for password
             password, ok = QInputDialog.getText(
                 self,
                 "PDF Password Required",
                 f"Enter password for:\n{os.path.basename(file_path)}",
-                QInputDialog.Password
+                QLineEdit.Password
             )
 
             if not ok or not password:
-                test_doc.close()
-                return False
-
-            # Test password
-            if test_doc.authenticate(password):
-                test_doc.close()
-
-                # Ask if user wants to remember password
-                remember = QMessageBox.question(
-                    self,
-                    "Remember Password",
-                    "Would you like to remember this password for future sessions?\n"
-                    "(Password will be stored in application settings)",
-                    QMessageBox.Yes | QMessageBox.No,
-                    QMessageBox.No
-                )
-
-                if remember == QMessageBox.Yes:
-                    settings_manager.save_encryption_password(file_path, password)
-
-                # Try opening again
-                return self.ui.pdfView.open_document(file_path)
-            else:
-                test_doc.close()
-                QMessageBox.warning(
-                    self,
-                    "Invalid Password",
-                    "The password you entered is incorrect."
-                )
-                return False
+                self._password_retry_path = None
+                if locked is not None:
+                    locked.close()
+                return
+
+            # Key setup and the page-geometry pass run on the worker
+            self._password_retry_path = file_path
+            self._start_document_load(file_path, password=password, document=locked)
 
         except Exception as e:
+            self._password_retry_path = None
             QMessageBox.critical(
                 self,
                 "Error",
                 f"Error handling encrypted document: {str(e)}"
             )
-            return False
 
-    def update_ui_state(self):
-        """Update UI state based on document availability"""
+    def _offer_remember_password(self, file_path: str):
+        """After a password-dialog retry succeeded, offer to store the password"""
+        self._password_retry_path = None
+        password = self.ui.pdfView.document_password
+        if not password:
+            return
+        # Ask if user wants to remember password
+        remember = QMessageBox.question(
+            self,
+            "Remember Password",
+            "Would you like to remember this password for future sessions?\n"
+            "(Password will be stored in application settings)",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
 
-        has_document = self.ui.pdfView.document is not None
-        # hasattr(self.ui.pdfView, 'document') and self.ui.pdfView.document is not None
-        stat_ops = has_document and not self.ui.pdfView.drawing_mode
-        # drawing = self.ui.pdfView.drawing_mode
-
-        print(f"Updating UI state, has_document: {has_document}")
-
-        # Update file actions
-        # if hasattr(self.ui, 'actionOpen'):
-        #     self.ui.actionOpen.setEnabled(not drawing)
-        # if hasattr(self.ui, 'menuOpenRecent'):
-        #     self.ui.menuOpenRecent.setEnabled(not drawing)
-
-        if hasattr(self.ui, 'actionSave'):
-            self.ui.actionSave.setEnabled(has_document and self.is_document_modified)
-        if hasattr(self.ui, 'actionSaveAs'):
-            self.ui.actionSaveAs.setEnabled(stat_ops)
-        if hasattr(self.ui, 'actionClosePdf'):
-            self.ui.actionClosePdf.setEnabled(stat_ops)
-        if hasattr(self.ui, 'actionPrint'):
-            self.ui.actionPrint.setEnabled(stat_ops)
-        if hasattr(self.ui, 'actionCompress'):
-            self.ui.actionCompress.setEnabled(stat_ops)
-        if hasattr(self.ui, 'actionEmail'):
-            self.ui.actionEmail.setEnabled(stat_ops)
-        if hasattr(self.ui, 'actionAboutPdf'):
-            self.ui.actionAboutPdf.setEnabled(stat_ops)
-        if hasattr(self.ui, 'actionDraw'):
-            self.ui.actionDraw.setEnabled(has_document)
-        if hasattr(self.ui, 'actionAddFile'):
-            self.ui.actionAddFile.setEnabled(stat_ops)
-        if hasattr(self.ui, 'actionExport_Pages'):
-            self.ui.actionExport_Pages.setEnabled(stat_ops)
-
-        # Navigation
-        for action_name in [
-            'actionPrevious_Page', 'actionNext_Page',
-            'actionJumpToFirstPage', 'actionJumpToLastPage'
-        ]:
-            if hasattr(self.ui, action_name):
-                getattr(self.ui, action_name).setEnabled(stat_ops)
+        if remember == QMessageBox.Yes:
+            settings_manager.save_encryption_password(file_path, password)
 
-        # Page manipulation
-        for action_name in [
+    def _build_action_groups(self):
+        """Collect the QActions whose enabled state follows the document state"""
+        def resolve(names):
+            return tuple(getattr(self.ui, name) for name in names if hasattr(self.ui, name))
+
+        # Enabled only with a document and outside drawing mode
+        self._doc_actions = resolve((
+            'actionSaveAs', 'actionClosePdf', 'actionPrint', 'actionCompress', 'actionEmail',
+            'actionAboutPdf', 'actionAddFile', 'actionExport_Pages',
+            # Navigation
+            'actionPrevious_Page', 'actionNext_Page',
+            'actionJumpToFirstPage', 'actionJumpToLastPage',
+            # Page manipulation
             'actionDeletePage', 'actionDeleteSpecificPages',
             'actionMovePageUp', 'actionMovePageDown',
             'actionRotateCurrentPageClockwise', 'actionRotateCurrentPageCounterclockwise',
             'actionRotateAllPagesClockwise',
-        ]:
-            if hasattr(self.ui, action_name):
-                getattr(self.ui, action_name).setEnabled(stat_ops)
-
-        # Zoom
-        for action_name in [
+        ))
+        # Enabled whenever a document is open (drawing mode included)
+        self._view_actions = resolve((
+            'actionDraw',
             'actionZoom_In', 'actionZoom_Out',
-            'actionFitToWidth', 'actionFitToHeight'
-        ]:
-            if hasattr(self.ui, action_name):
-                getattr(self.ui, action_name).setEnabled(has_document)
+            'actionFitToWidth', 'actionFitToHeight',
+        ))
+        self._save_action = getattr(self.ui, 'actionSave', None)
+        # (has_document, stat_ops, can_save) applied by the last update_ui_state
+        self._last_ui_state = None
+        # Enabled state last pushed to each action (None = never set by us)
+        self._last_enabled = {action: None for action in self._doc_actions + self._view_actions}
+        if self._save_action is not None:
+            self._last_enabled[self._save_action] = None
+
+    def update_ui_state(self):
+        """Update UI state based on document availability"""
+
+        pv = self._pdf_view
+        has_document = pv.document is not None
+        stat_ops = has_document and not pv.drawing_mode
+        can_save = has_document and self.is_document_modified
+
+        state = (has_document, stat_ops, can_save)
+        if state == self._last_ui_state:
+            return
+        self._last_ui_state = state
+
+        log.debug("Updating UI state, has_document: %s", has_document)
+
+        # Only reached on a real state change, when most toolbar actions flip at once:
+        # repaint the window once afterwards instead of once per action
+        # (unless a caller such as _finish_load_document is already batching)
+        batch = self.updatesEnabled()
+        if batch:
+            self.setUpdatesEnabled(False)
+        try:
+            if self._save_action is not None:
+                self._set_actions_enabled((self._save_action,), can_save)
+            self._set_actions_enabled(self._doc_actions, stat_ops)
+            self._set_actions_enabled(self._view_actions, has_document)
+        finally:
+            if batch:
+                self.setUpdatesEnabled(True)
+
+    def _set_actions_enabled(self, actions, enabled: bool):
+        """setEnabled only on actions whose state actually changes (each call emits changed())"""
+        last = self._last_enabled
+        for action in actions:
+            if last[action] != enabled:
+                action.setEnabled(enabled)
+                last[action] = enabled
+
+    def schedule_ui_update(self):
+        """Request update_ui_state + update_page_info within the next 30 ms"""
+        # Not restarted while pending: a steady stream of requests must not postpone it forever
+        if not self._ui_update_timer.isActive():
+            self._ui_update_timer.start()
+
+    @Slot()
+    def _flush_ui_updates(self):
+        self.update_ui_state()
+        # Already coalesced by _ui_update_timer, no need to wait another frame
+        self._page_info_timer.stop()
+        self._do_update_page_info()
 
     def get_current_display_page_number(self) -> int:
         """Get the current page's display number (1-based) using pdfView.pages_info and deleted_pages"""
@@ -482,101 +709,149 @@ class MainWindow(QMainWindow):
         #     return 1
 
         # pdfView.get_current_page() now returns ORIGINAL page number
-        current_original = self.ui.pdfView.get_current_page()
-        display_number = 1
-        for i, info in enumerate(self.ui.pdfView.page_widget_controller.pages_info):
-            if info.page_num in self.ui.pdfView.deleted_pages:
-                continue
-            if info.page_num == current_original:
-                return display_number
-            display_number += 1
-        return 1
+        return self._display_by_page.get(self._pdf_view.get_current_page(), 1)
 
     def get_total_display_pages(self) -> int:
         """Total visible pages (non-deleted)"""
-        return self.ui.pdfView.page_widget_controller.countTotalPagesInfo
+        return len(self._display_order)
 
     def get_chunk_info_count(self):
-        return self.ui.pdfView.page_widget_controller.current_chunk_index + 1, \
-            len(self.ui.pdfView.page_widget_controller.chunks)
+        controller = self._pdf_view.page_widget_controller
+        return controller.current_chunk_index + 1, len(controller.chunks)
 
     def get_actual_page_from_display_number(self, display_number: int) -> int:
         """Convert a 1-based display number into a layout index (index into page_widgets/pages_info)"""
         # if not hasattr(self.ui.pdfView, 'pages_info') or not self.ui.pdfView.pages_info:
         #     return 0
-        current_display = 1
-        for i, info in enumerate(self.ui.pdfView.page_widget_controller.pages_info):
-            if info.page_num in self.ui.pdfView.deleted_pages:
-                continue
-            if current_display == display_number:
-                return i  # return layout index
-            current_display += 1
+        if 1 <= display_number <= len(self._display_order):
+            return self._display_order[display_number - 1]
         return 0
 
+    @Slot()
+    def _rebuild_display_index(self):
+        """Recompute display-number lookups after pages_info/deleted_pages change"""
+        pv = self._pdf_view
+        self._last_page_signal = -1
+        self._last_thumb_page = -1
+        deleted = pv.deleted_pages
+        order = []
+        by_page = {}
+        to_layout = {}
+        for i, info in enumerate(pv.page_widget_controller.pages_info):
+            to_layout[info.page_num] = i
+            if info.page_num in deleted:
+                continue
+            order.append(i)
+            by_page[info.page_num] = len(order)
+        self._display_order = order
+        self._display_by_page = by_page
+        self._original_to_layout = to_layout
+        self._page_validator.setTop(max(1, len(order)))
+
+    def _sync_thumbnail_selection(self):
+        """Move the thumbnail highlight to the last page reported by the viewer, if it changed"""
+        page_num = self._pending_thumb_page
+        if page_num < 0 or page_num == self._last_thumb_page:
+            return
+        self._last_thumb_page = page_num
+        # thumbnailList probably expects original page number; if it expects layout index adjust accordingly
+        try:
+            self._thumb.set_current_page(page_num)
+        except Exception:
+            # fallback: convert orig -> layout and call with layout index
+            layout_idx = self._pdf_view.layout_index_for_original(page_num)
+            if layout_idx is not None:
+                self._thumb.set_current_page(layout_idx)
+
     def update_page_info(self):
+        """Schedule a toolbar/status refresh (coalesced to one per frame)"""
+        # Throttle rather than debounce, so the label keeps up during continuous scrolling
+        if not self._page_info_timer.isActive():
+            self._page_info_timer.start()
+
+    @Slot()
+    def _do_update_page_info(self):
         """Update toolbar/status with display numbers"""
-        if hasattr(self.ui.pdfView, 'document') and self.ui.pdfView.document:
-            current_display_page = self.get_current_display_page_number()
-            total_display_pages = self.get_total_display_pages()
-            current_chunk, total_chunk = self.get_chunk_info_count()
+        pv = self._pdf_view
+        self._sync_thumbnail_selection()
+        if pv.document is not None:
+            # Same lookups as get_current_display_page_number / get_chunk_info_count,
+            # inlined: this runs on every page change while scrolling
+            current_display_page = self._display_by_page.get(pv.get_current_page(), 1)
+            total_display_pages = len(self._display_order)
+            controller = pv.page_widget_controller
+            current_chunk, total_chunk = controller.current_chunk_index + 1, len(controller.chunks)
+
+            # Nothing to rebuild unless the numbers changed or the bar no longer shows our text
+            # (another message, or Qt clearing it, e.g. an empty status tip from a menu)
+            page_info = (current_display_page, total_display_pages, current_chunk, total_chunk)
+            if page_info == self._last_page_info and self._status_bar.currentMessage() == self._last_page_status:
+                return
+            self._last_page_info = page_info
 
-            if hasattr(self.ui, 'm_pageInput'):
-                self.ui.m_pageInput.setText(str(current_display_page))
-            if hasattr(self.ui, 'm_pageLabel'):
-                self.ui.m_pageLabel.setText(f"of {total_display_pages}")
+            self._set_page_texts(str(current_display_page), f"of {total_display_pages}")
 
             # 03.04.2026 - как-то вывести зуммирование на смену страницы
             # при условии, что это не манипулирование скроллом
             # self.pageInputEditing()
 
-            if hasattr(self, 'statusBar'):
-                self.statusBar().showMessage(f"Страница {current_display_page} из {total_display_pages}. Часть {current_chunk} из {total_chunk}")
+            self._last_page_status = (f"Страница {current_display_page} из {total_display_pages}. "
+                                      f"Часть {current_chunk} из {total_chunk}")
+            self._show_status(self._last_page_status)
         else:
-            if hasattr(self.ui, 'm_pageInput'):
-                self.ui.m_pageInput.setText("")
-            if hasattr(self.ui, 'm_pageLabel'):
-                self.ui.m_pageLabel.setText("of 0")
-            if hasattr(self, 'statusBar'):
-                self.statusBar().showMessage("No document")
+            self._last_page_info = None
+            self._set_page_texts("", "of 0")
+            self._show_status("No document")
+
+    def _set_page_texts(self, page_text: str, total_text: str):
+        """setText on the page input/label only when the text differs (each call relayouts the toolbar)"""
+        ui = self.ui
+        if ui.m_pageInput.text() != page_text:
+            ui.m_pageInput.setText(page_text)
+        if ui.m_pageLabel.text() != total_text:
+            ui.m_pageLabel.setText(total_text)
+
+    def _show_status(self, text: str):
+        """showMessage only when the bar does not already show text"""
+        # Compared with the bar itself: Qt clears it on its own (e.g. empty status tips)
+        if self._status_bar.currentMessage() != text:
+            self._status_bar.showMessage(text)
 
     # def update_zoom_state(self):
     #     self.ui.actionFitToWidth.setChecked(1 * self.ui.pdfView.zoom_type)
     #     pass
 
+    @Slot()
     def go_to_page_input(self):
         """User typed a page number: convert display number -> layout index -> go_to_page"""
-        try:
-            if hasattr(self.ui, 'm_pageInput'):
-                page_text = self.ui.m_pageInput.text()
-                display_page_num = int(page_text)  # 1-based display number
-                total_pages = self.get_total_display_pages()
-                if 1 <= display_page_num <= total_pages:
-                    layout_index = self.get_actual_page_from_display_number(display_page_num)
-                    if hasattr(self.ui.pdfView, 'go_to_page'):
-                        # self.ui.pdfView.go_to_page(layout_index)
-
-                        self.ui.pdfView.scroll_to_page(layout_index)
-                else:
-                    current_display_page = self.get_current_display_page_number()
-                    self.ui.m_pageInput.setText(str(current_display_page))
-        except (ValueError, Exception) as e:
-            print(f"[go_to_page_input] {e}")
-            current_display_page = self.get_current_display_page_number()
-            if hasattr(self.ui, 'm_pageInput'):
-                self.ui.m_pageInput.setText(str(current_display_page))
+        page_input = self.ui.m_pageInput
+        # The validator limits input to 1..page count; anything else (e.g. empty) is reset
+        if not page_input.hasAcceptableInput():
+            page_input.setText(str(self.get_current_display_page_number()))
+            return
+        display_page_num = int(page_input.text())  # 1-based display number
+        if display_page_num == self.get_current_display_page_number():
+            return
+        layout_index = self.get_actual_page_from_display_number(display_page_num)
+        # self.ui.pdfView.go_to_page(layout_index)
+        self._pdf_view.scroll_to_page(layout_index)
 
     def ask_save_changes(self) -> int:
         """Спросить пользователя, хочет ли он сохранить изменения"""
-        msg_box = QMessageBox(self)
-        msg_box.setWindowTitle("")  # only write app name
-        msg_box.setText("Сохранить изменения?")  # перед закрытием
-        msg_box.setIcon(QMessageBox.Question)
-
-        # Создаем кнопки с русским текстом
-        save_btn = msg_box.addButton("Да", QMessageBox.AcceptRole)
-        discard_btn = msg_box.addButton("Нет", QMessageBox.DestructiveRole)
-        cancel_btn = msg_box.addButton("Отмена", QMessageBox.RejectRole)
-
+        # The dialog is built on first use and reused afterwards
+        if self._save_changes_box is None:
+            msg_box = QMessageBox(self)
+            msg_box.setWindowTitle("")  # only write app name
+            msg_box.setText("Сохранить изменения?")  # перед закрытием
+            msg_box.setIcon(QMessageBox.Question)
+
+            # Создаем кнопки с русским текстом
+            save_btn = msg_box.addButton("Да", QMessageBox.AcceptRole)
+            discard_btn = msg_box.addButton("Нет", QMessageBox.DestructiveRole)
+            cancel_btn = msg_box.addButton("Отмена", QMessageBox.RejectRole)
+            self._save_changes_box = (msg_box, save_btn, discard_btn, cancel_btn)
+
+        msg_box, save_btn, discard_btn, cancel_btn = self._save_changes_box
         # Устанавливаем кнопку по умолчанию
         msg_box.setDefaultButton(save_btn)
 
@@ -591,33 +866,60 @@ class MainWindow(QMainWindow):
         else:  # cancel_btn
             return QMessageBox.Cancel
 
+    def set_current_document(self, path: str):
+        """Switch to path (opened or saved as): refresh the cached basename and the title"""
+        self.current_document_path = path
+        self._current_basename = os.path.basename(path)
+        self._set_title(f"{APP_NAME} — {self._current_basename}")
+
+    def reset_document_state(self):
+        """Forget the closed document's path, basename and loaded bookmarks"""
+        self.current_document_path = ""
+        self._current_basename = ""
+        self._bookmarks_loaded_for = None
+        self._set_title(APP_NAME)
+
+    def default_export_basename(self) -> str:
+        """Current file name without extension, for Save As / export defaults"""
+        return os.path.splitext(self._current_basename)[0] or "document"
+
+    def display_order(self) -> list[int]:
+        """Layout indices of non-deleted pages in display order (a copy)"""
+        return list(self._display_order)
+
+    def current_zoom(self) -> float:
+        """Zoom level last reported by the viewer"""
+        return self._current_zoom
+
     def update_window_title(self):
         """Update window title to reflect modification status"""
         if self.current_document_path:
-            filename = os.path.basename(self.current_document_path)
-            if self.is_document_modified:
-                self.setWindowTitle(f"{APP_NAME} — {filename}*")
-            else:
-                self.setWindowTitle(f"{APP_NAME} — {filename}")
+            self._set_title(f"{APP_NAME} — {self._current_basename}{'*' if self.is_document_modified else ''}")
         else:
-            self.setWindowTitle(APP_NAME)
+            self._set_title(APP_NAME)
+
+    def _set_title(self, title: str):
+        """setWindowTitle only when the text actually changes"""
+        if title != self._last_title:
+            self._last_title = title
+            self.setWindowTitle(title)
 
     # Event handlers
+    @Slot(int)
     def on_page_changed(self, orig_page_num: int):
         """pdfView now emits ORIGINAL page numbers; thumbnail widget likely expects original page ids"""
         # print(f"Calling 'on_page_changed' from main_window to page {orig_page_num}")
-        if hasattr(self.ui.thumbnailList, 'set_current_page'):
-            # thumbnailList probably expects original page number; if it expects layout index adjust accordingly
-            try:
-                self.ui.thumbnailList.set_current_page(orig_page_num)
-            except Exception:
-                # fallback: convert orig -> layout and call with layout index
-                layout_idx = self.ui.pdfView.layout_index_for_original(orig_page_num)
-                if layout_idx is not None and hasattr(self.ui.thumbnailList, 'set_current_page'):
-                    self.ui.thumbnailList.set_current_page(layout_idx)
+        # Relayout / programmatic scrolls re-emit the same page; nothing to update then
+        if orig_page_num == self._last_page_signal:
+            return
+        self._last_page_signal = orig_page_num
+        # The thumbnail highlight follows in the throttled page-info refresh
+        # (_sync_thumbnail_selection), not on every page crossed while scrolling
+        self._pending_thumb_page = orig_page_num
         self.update_page_info()
         # print(f"o:{orig_page_num}, g:{self.ui.pdfView.get_current_page()}")
 
+    @Slot(bool)
     def on_action_draw_toggled(self, checked: bool):
         """Toggle drawing mode. If turning off and there are unsaved drawings prompt Save/Discard/Cancel."""
         ui = self.ui
@@ -639,7 +941,16 @@ class MainWindow(QMainWindow):
                 ui.actionDraw.setChecked(not checked)
                 return
 
-        pv.drawing_mode = checked
+        # Leaving draw mode commits every page overlay, each emitting document_modified(True);
+        # on_document_modified only records the flag meanwhile, the UI is refreshed once below
+        was_modified = self.is_document_modified
+        self._draw_toggle_in_progress = True
+        try:
+            pv.drawing_mode = checked
+        finally:
+            self._draw_toggle_in_progress = False
+        if self.is_document_modified != was_modified:
+            self.update_window_title()
 
         if checked:
             # Hide page navigation widgets in toolbar
@@ -703,92 +1014,135 @@ class MainWindow(QMainWindow):
         # Keep sub-panel visibility in sync
         self._sync_draw_tool_ui(tool)
 
+    @Slot()
     def _draw_open_color_dialog(self):
         """Alias kept for backward compatibility - delegates to brush dialog."""
         self._draw_open_color_dialog_brush()
 
+    @Slot()
     def _draw_clear_current_page(self):
         """Clear annotations on the current page."""
-        if hasattr(self.ui.pdfView, '_clear_current_page_overlay'):
-            self.ui.pdfView._clear_current_page_overlay()
+        # PDFViewer._clear_current_page_overlay is commented out for now, so the button does nothing
+        pass
 
+    @Slot()
     def _draw_clear_all_pages(self):
         """Clear annotations on all pages."""
         self.ui.pdfView.clear_all_pages_overlay()
         self._update_undo_redo_buttons()
 
+    @Slot()
     def _draw_close_mode(self):
         """Uncheck the Draw action, which triggers on_action_draw_toggled(False)."""
         self.ui.actionDraw.setChecked(False)
 
+    @Slot(bool)
     def on_document_modified(self, is_modified: bool):
         """Handle document modification status change"""
+        if self._draw_toggle_in_progress:
+            # on_action_draw_toggled updates the UI itself once the mode switch is done
+            self.is_document_modified = is_modified
+            return
         self.is_document_modified = is_modified
-        self.update_ui_state()
+        self.schedule_ui_update()
         self.update_window_title()
 
+    @Slot(int)
     def on_thumbnail_clicked(self, page_num: int):
         """thumbnail clicked might send ORIGINAL page number or layout index; adapt"""
-        if not hasattr(self.ui.pdfView, 'go_to_page'):
-            return
-
+        pv = self._pdf_view
         # If thumbnail widget sends original id -> convert to layout index
-        layout_idx = None
-        if hasattr(self.ui.pdfView, 'pages_info'):
-            # try to interpret as original
-            for i, info in enumerate(self.ui.pdfView.pages_info):
-                if info.page_num == page_num:
-                    layout_idx = i
-                    break
+        layout_idx = self._original_to_layout.get(page_num)
 
         # If not found as original, maybe page_num already is a layout index
         if layout_idx is None:
             # sanity-check bounds
             try:
-                if 0 <= int(page_num) < self.ui.pdfView.page_widget_controller.getLastPageWidget().orig_page_num:
+                if 0 <= int(page_num) < pv.page_widget_controller.getLastPageWidget().orig_page_num:
                     layout_idx = int(page_num)
             except Exception:
                 return
 
         if layout_idx is not None:
-            self.ui.pdfView.go_to_page(layout_idx)
+            # scroll_to_page also switches the page chunk when needed (go_to_page does not)
+            pv.scroll_to_page(layout_idx)
 
+    @Slot(float)
     def on_zoom_changed(self, zoom_factor: float):
         """Handle zoom change from zoom selector"""
-        if hasattr(self.ui.pdfView, 'set_zoom'):
-            zoom_factor = max(0.25, min(5.0, zoom_factor))
-            self.ui.pdfView.set_zoom(zoom_factor, margin_y=0)
-
-        # Save zoom level
-        settings_manager.save_zoom_level(zoom_factor)
+        # Applied at most once per frame; only the latest value matters
+        self._pending_zoom = max(0.25, min(5.0, zoom_factor))
+        if not self._zoom_timer.isActive():
+            self._zoom_timer.start()
+        # Zoom level is persisted once on close (save_window_settings)
+
+    @Slot()
+    def _apply_pending_zoom(self):
+        if self._pending_zoom is None:
+            return
+        zoom_factor, self._pending_zoom = self._pending_zoom, None
+        self._pdf_view.set_zoom(zoom_factor, margin_y=0)
+        self._current_zoom = self._pdf_view.zoom_level
+
+    @Slot(float)
+    def _on_viewer_zoom_changed(self, zoom_level: float):
+        """Track zoom changes made by the viewer itself (fit modes, Ctrl+wheel)"""
+        self._current_zoom = zoom_level
+
+    @Slot()
+    def _mark_geometry_dirty(self, *args):
+        if self._geometry_tracking:
+            self._geometry_dirty = True
+
+    def _start_geometry_tracking(self):
+        self._geometry_dirty = False
+        self._geometry_tracking = True
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._pending_panel_state is not None:
+            panel_visible, panel_width = self._pending_panel_state
+            self._pending_panel_state = None
+            sizes = self._splitter_sizes(self.width(), panel_visible, panel_width)
+            # Already laid out like this (e.g. restored at the saved size): no extra relayout
+            if self.ui.splitter.sizes() != sizes:
+                self.ui.splitter.setSizes(sizes)
+        if not self._geometry_tracking:
+            QTimer.singleShot(0, self._start_geometry_tracking)
+
+    def moveEvent(self, event):
+        super().moveEvent(event)
+        self._mark_geometry_dirty()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._mark_geometry_dirty()
 
     # Drag and drop support
+    @staticmethod
+    def _is_pdf_url(url) -> bool:
+        # Only the last path segment is needed for the suffix check, not the whole local path
+        return url.isLocalFile() and url.fileName()[-4:].lower() == ".pdf"
+
     def dragEnterEvent(self, event: QDragEnterEvent):
-        # Drawing mode: accept drop (will open in new instance)
-        if self.ui.pdfView.drawing_mode:
-            if event.mimeData().hasUrls():
-                urls = event.mimeData().urls()
-                if urls and urls[0].toLocalFile().lower().endswith('.pdf'):
-                    event.accept()
-                    return
+        mime = event.mimeData()
+        if not mime.hasUrls():
             event.ignore()
             return
-        if event.mimeData().hasUrls():
-            urls = event.mimeData().urls()
-            if urls and urls[0].toLocalFile().lower().endswith('.pdf'):
-                event.accept()
-            else:
-                event.ignore()
+        # Drawing mode also accepts the drop (it will open in a new instance)
+        urls = mime.urls()
+        if urls and self._is_pdf_url(urls[0]):
+            # Drag-move events inherit this decision; dragMoveEvent is deliberately not
+            # overridden so they never call into Python
+            event.acceptProposedAction()
         else:
             event.ignore()
 
     def dropEvent(self, event: QDropEvent):
         urls = event.mimeData().urls()
-        if not urls:
+        if not urls or not self._is_pdf_url(urls[0]):
             return
         file_path = urls[0].toLocalFile()
-        if not file_path.lower().endswith('.pdf'):
-            return
         # Drawing mode: open in new instance
         if self.ui.pdfView.drawing_mode:
             self.actions_handler._launch_new_instance(file_path)
@@ -797,28 +1151,27 @@ class MainWindow(QMainWindow):
 
     def cleanup_before_close(self):
         """Aggressive cleanup before application closes"""
-        print("Performing aggressive cleanup before close...")
+        if self._cleaned_up:
+            return
+        self._cleaned_up = True
+        log.debug("Performing aggressive cleanup before close...")
 
         # # Clear thumbnails
-        if hasattr(self.ui, 'thumbnailList') and hasattr(self.ui.thumbnailList, 'clear_thumbnails'):
-            self.ui.thumbnailList.clear_thumbnails()
+        self._thumb.clear_thumbnails()
 
         # Close PDF viewer document
-        if hasattr(self.ui, 'pdfView') and hasattr(self.ui.pdfView, 'close_document'):
-            self.ui.pdfView.close_document()
+        self._pdf_view.close_document()
 
         # Clear any remaining references
-        self.current_document_path = ""
+        self.reset_document_state()
         self.is_document_modified = False
 
         # Clear actions handler if it holds references
         if hasattr(self, 'actions_handler'):
             self.actions_handler = None
 
-        # Force final garbage collection
-        import gc
-        for _ in range(3):
-            gc.collect()
+        # One full collection reclaims all unreachable cycles before Qt teardown
+        gc.collect()
 
     # def pageInputEditing(self):
     #     self.ui.pdfView.zoom_action[self.ui.pdfView.zoom_type]()
@@ -826,6 +1179,7 @@ class MainWindow(QMainWindow):
     # ------------------------------------------------------------------ #
     # Context menu on PDF viewer
     # ------------------------------------------------------------------ #
+    @Slot(QPoint)
     def _show_page_context_menu(self, pos):
         """Show right-click context menu for page operations.
         Suppressed while in drawing mode."""
@@ -836,7 +1190,6 @@ class MainWindow(QMainWindow):
         if pv.drawing_mode:
             return
 
-        from PySide6.QtGui import QIcon
         menu = QMenu(self)
 
         act_cw  = menu.addAction(QIcon(":/light_theme_v2/rotate_temp_clockwise.png"),
@@ -881,6 +1234,7 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
 
+    @Slot(int)
     def _draw_set_brush_size(self, size: int):
         self.ui.pdfView.draw_state['brush_size'] = size
         for w in self.ui.pdfView.page_widget_controller.page_widgets:
@@ -889,9 +1243,9 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
         # Refresh brush thickness-preview icon
-        if hasattr(self.ui, '_update_brush_size_preview'):
-            self.ui._update_brush_size_preview(size)
+        self.ui._update_brush_size_preview(size)
 
+    @Slot(int)
     def _draw_set_brush_opacity(self, opacity_percent: int):
         # opacity_percent here is transparency: 0=fully visible, 90=nearly invisible
         visibility = 100 - opacity_percent
@@ -902,6 +1256,7 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
 
+    @Slot(int)
     def _draw_set_rect_opacity(self, opacity_percent: int):
         visibility = 100 - opacity_percent
         self.ui.pdfView.draw_state['rect_opacity'] = visibility
@@ -911,9 +1266,8 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
 
+    @Slot()
     def _draw_open_rect_fill_color_dialog(self):
-        from PySide6.QtWidgets import QColorDialog
-        from PySide6.QtGui import QColor
         menu = QMenu(self)
         act_pick    = menu.addAction("Выбрать цвет заливки…")
         act_no_fill = menu.addAction("Без заливки (прозрачно)")
@@ -944,9 +1298,8 @@ class MainWindow(QMainWindow):
                     except Exception:
                         pass
 
+    @Slot()
     def _draw_open_rect_border_color_dialog(self):
-        from PySide6.QtWidgets import QColorDialog
-        from PySide6.QtGui import QColor
         current = getattr(self.ui, "_draw_rect_border_color", None) or QColor(Qt.black)
         color = QColorDialog.getColor(
             current, self, "Цвет рамки прямоугольника",
@@ -962,9 +1315,9 @@ class MainWindow(QMainWindow):
                 except Exception:
                     pass
             # Refresh border thickness-preview icon (uses border colour)
-            if hasattr(self.ui, '_update_border_width_preview') and hasattr(self.ui, 'drawRectBorderWidthSlider'):
-                self.ui._update_border_width_preview(self.ui.drawRectBorderWidthSlider.value())
+            self.ui._update_border_width_preview(self.ui.drawRectBorderWidthSlider.value())
 
+    @Slot(int)
     def _draw_set_rect_border_width(self, width: int):
         self.ui.pdfView.draw_state['rect_border_width'] = width
         for w in self.ui.pdfView.page_widget_controller.page_widgets:
@@ -973,13 +1326,10 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
         # Refresh border thickness-preview icon
-        if hasattr(self.ui, '_update_border_width_preview'):
-            self.ui._update_border_width_preview(width)
+        self.ui._update_border_width_preview(width)
 
     def _draw_open_color_dialog_brush(self):
         """Open colour picker for brush and propagate to overlays."""
-        from PySide6.QtWidgets import QColorDialog
-        from PySide6.QtGui import QColor
         current = getattr(self.ui, '_draw_current_color', None) or QColor(0, 0, 0)
         color = QColorDialog.getColor(
             current, self, "Выберите цвет кисти",
@@ -988,18 +1338,17 @@ class MainWindow(QMainWindow):
         if color.isValid():
             self.ui._draw_current_color = color
             self.ui.pdfView.draw_state['brush_color'] = color
-            if hasattr(self.ui, '_update_draw_color_btn_icon'):
-                self.ui._update_draw_color_btn_icon()
+            self.ui._update_draw_color_btn_icon()
             for w in self.ui.pdfView.page_widget_controller.page_widgets:
                 try:
                     w.overlay.set_color(color)
                 except Exception:
                     pass
             # Refresh thickness-preview icon (circle uses brush colour)
-            if hasattr(self.ui, '_update_brush_size_preview') and hasattr(self.ui, 'drawBrushSizeSlider'):
-                self.ui._update_brush_size_preview(self.ui.drawBrushSizeSlider.value())
+            self.ui._update_brush_size_preview(self.ui.drawBrushSizeSlider.value())
 
 
+    @Slot()
     def _draw_undo(self):
         """Undo last drawing action on the current page overlay."""
         pv = self.ui.pdfView
@@ -1014,6 +1363,7 @@ class MainWindow(QMainWindow):
             except Exception:
                 pass
 
+    @Slot()
     def _draw_redo(self):
         """Redo last undone drawing action on the current page overlay."""
         pv = self.ui.pdfView
@@ -1030,8 +1380,6 @@ class MainWindow(QMainWindow):
 
     def _update_undo_redo_buttons(self, overlay=None):
         """Grey out Undo/Redo buttons based on overlay stack state."""
-        if not hasattr(self.ui, 'drawUndoBtn'):
-            return
         if overlay is None:
             # Find the currently enabled overlay
             for w in self.ui.pdfView.page_widget_controller.page_widgets:
@@ -1058,10 +1406,8 @@ class MainWindow(QMainWindow):
                 btn.setChecked(active)
                 btn.blockSignals(False)
         # Show/hide sub-panels
-        if hasattr(ui, 'brushSettingsWidget'):
-            ui.brushSettingsWidget.setVisible(is_brush)
-        if hasattr(ui, 'rectSettingsWidget'):
-            ui.rectSettingsWidget.setVisible(not is_brush)
+        ui.brushSettingsWidget.setVisible(is_brush)
+        ui.rectSettingsWidget.setVisible(not is_brush)
 
     def closeEvent(self, event):
         """Handle application close event"""
@@ -1075,10 +1421,19 @@ class MainWindow(QMainWindow):
                     event.ignore()
                     return
 
-        # Save window settings before closing
-        self.save_window_settings()
-
-        # Perform aggressive cleanup
-        self.cleanup_before_close()
+        # Save window settings before closing (skipped if nothing was moved/resized/changed)
+        if self._geometry_dirty or self._current_zoom != self._saved_zoom:
+            self.save_window_settings()
+        # Recent files / passwords changed during the session are buffered until now
+        settings_manager.sync()
+
+        # Hide right away so quitting feels instant; the document/widget teardown
+        # runs on aboutToQuit, once the window is already gone from the screen
+        self.hide()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.cleanup_before_close, Qt.UniqueConnection)
+        else:
+            self.cleanup_before_close()
 
         event.accept()
@@ -1,4 +1,5 @@
 # import copy
+import logging
 import math
 import os
 import gc
@@ -24,6 +25,9 @@ from PySide6.QtGui import QPixmap, QColor, QWheelEvent, QMouseEvent, QIcon, QPai
 import fitz  # PyMuPDF
 from fitz import Page, Point
 
+# Zoom/save tracing; silent unless DEBUG is enabled
+log = logging.getLogger(__name__)
+
 
 # TODO: Миниатюры прикрутить к текущей странице
 
@@ -36,6 +40,7 @@ class PDFViewer(QScrollArea):
     page_changed = Signal(int)  # emits ORIGINAL page number
     document_modified = Signal(bool)
     set_zoom_signal = Signal(float)
+    layout_changed = Signal()  # pages_info or deleted_pages changed
 
     zoom_type_changed = Signal(int)
 
@@ -76,6 +81,10 @@ class PDFViewer(QScrollArea):
         self.document: Document = None
         self.doc_path = ""
         self.document_password = ""
+        # Why the last open_document() failed: None, "encrypted", "corrupt" or "error"
+        self.last_open_error: Optional[str] = None
+        # Handle left open when authentication failed, so a retry does not re-parse the file
+        self._locked_document: Optional[Document] = None
         # self.pages_info: list[PageInfo] = []  # layout order list; each entry has .page_num (original)
         # self.page_widgets: list[PageWidget] = []  # same order as pages_info
         self.pages_container = QWidget()
@@ -157,6 +166,7 @@ class PDFViewer(QScrollArea):
         cur_page_num = self.get_current_pageInfo_index()
 
         cur_page_widget = self.page_widget_controller.clipPageWidget(cur_page_num)
+        cur_page_widget.overlay.flush_pending_emit()
         cur_page_widget.overlay.set_enabled(value)
 
         self.reinitializePageWidgets()
@@ -194,23 +204,32 @@ class PDFViewer(QScrollArea):
         return QSize(width, height)
 
     # ---------------- Document open/close ----------------
-    def authenticate_document(self) -> Optional[str]:
-        """Handle password authentication for encrypted PDFs"""
+    def authenticate_document(self, password: Optional[str] = None, prompt: bool = True) -> Optional[str]:
+        """Handle password authentication for encrypted PDFs.
+
+        A given password (e.g. a stored one) is tried on the open handle first;
+        the user is only prompted if it is missing or wrong, and only if prompt
+        is True (callers with their own password dialog pass False).
+        """
         try:
             # temp_doc = fitz.open(file_path)
             if self.document.need_auth():
+                # authenticate() directly: Document.auth() would close the handle on failure
+                if password and self.document.current_doc.authenticate(password):
+                    return password
+                if not prompt:
+                    return None
                 password, ok = QInputDialog.getText(self, "Password Required",
                                                     f"File {os.path.basename(self.document.file_path)} is password protected.\nEnter password:",
                                                     QLineEdit.Password)
                 if ok and password:
-                    if self.document.auth(password):
+                    # The handle stays open on failure: open_document keeps it for a retry
+                    if self.document.current_doc.authenticate(password):
                         return password
                     else:
                         QMessageBox.warning(self, "Authentication Failed", "Invalid password!")
-                        self.document.close()
                         return None
                 else:
-                    self.document.close()
                     return None
             else:
                 return ""
@@ -219,32 +238,60 @@ class PDFViewer(QScrollArea):
             return None
 
     # 14.04.2026 ТЕСТ
-    def reinitializePageWidgets(self):
-        pages_info = []
-        if not self.drawing_mode:
-            pages_info = [self.document.get_page_info(i) for i in range(self.document.get_page_count())]
-        else:
-            pages_info.append(self.document.get_page_info(self.get_current_page()))
+    def reinitializePageWidgets(self, pages_info: Optional[List[PageInfo]] = None):
+        if pages_info is None:
+            pages_info = []
+            if not self.drawing_mode:
+                pages_info = [self.document.get_page_info(i) for i in range(self.document.get_page_count())]
+            else:
+                pages_info.append(self.document.get_page_info(self.get_current_page()))
         self.page_widget_controller.initPageInfoList(pages_info)
+        self.layout_changed.emit()
 
     # def reinitializePageWidgets(self):
     #     pages_info = [self.document.get_page_info(i) for i in range(self.document.get_page_count())]
     #     self.page_widget_controller.initPageInfoList(pages_info)
 
-    def open_document(self, file_path: str) -> bool:
-        """Open PDF document with immediate optimization"""
+    def open_document(self, file_path: str, preopened_doc: Optional[Document] = None,
+                      pages_info: Optional[List[PageInfo]] = None, password: Optional[str] = None,
+                      prompt: bool = True) -> bool:
+        """Open PDF document with immediate optimization.
+
+        preopened_doc / pages_info may come from a DocumentLoadWorker so the
+        parse and page-geometry pass do not run on the GUI thread again.
+        password unlocks an encrypted document on that same handle; on failure
+        False is returned and last_open_error tells why. prompt=False never asks
+        the user (see authenticate_document).
+        """
 
+        self.last_open_error = None
         try:
             print(f"PDFViewer: Opening document: {file_path}")
 
             self.close_document()
-            self.document = Document(file_path)
+            self.document = preopened_doc if preopened_doc is not None else Document(file_path)
+            if getattr(self.document, 'current_doc', None) is None:
+                # Document() only logs open errors; don't mistake this for a password problem
+                self.document = None
+                raise fitz.FileDataError(f"Cannot open {file_path}")
 
             self.zoom_level = 1.0
 
             # Handle password authentication
-            password = self.authenticate_document()
+            given_password = password
+            password = self.authenticate_document(password, prompt)
+            if password is None:
+                # Prompt cancelled or wrong password: the caller decides what to do next
+                # and can retry on this handle via take_locked_document()
+                self.last_open_error = "encrypted"
+                self._locked_document = self.document
+                self.document = None
+                return False
 
+            if not password and preopened_doc is not None and preopened_doc.current_doc.needs_pass:
+                # Unlocked before it got here (e.g. by DocumentLoadWorker with the given password);
+                # never fall back to the password of a previously open file
+                password = given_password
             self.document_password = password or ""
 
             # Quick document info extraction WITHOUT loading pages
@@ -254,7 +301,7 @@ class PDFViewer(QScrollArea):
             self.doc_path = file_path
             self.page_widget_controller.clear()
 
-            self.reinitializePageWidgets()
+            self.reinitializePageWidgets(pages_info)
 
             # Reset state and build placeholders
             self.is_modified = False
@@ -282,13 +329,27 @@ class PDFViewer(QScrollArea):
 
         except Exception as e:
             print(f"Error opening document: {e}")
+            self.last_open_error = "corrupt" if isinstance(e, fitz.FileDataError) else "error"
             QMessageBox.critical(self, "Error", f"Failed to open PDF: {e}")
             return False
 
+    def take_locked_document(self) -> Optional[Document]:
+        """Hand over the still-encrypted Document left by a failed open_document()"""
+        document, self._locked_document = self._locked_document, None
+        return document
+
     def close_document(self):
         """Close document and aggressively free resources"""
         print("Closing document - aggressive cleanup")
 
+        # Nobody retried the encrypted handle
+        locked = self.take_locked_document()
+        if locked is not None:
+            try:
+                locked.close()
+            except Exception as e:
+                print(f"Error closing document: {e}")
+
         # Cancel all active renders first
         self.cancel_all_renders()
 
@@ -311,6 +372,7 @@ class PDFViewer(QScrollArea):
         # self.pages_info.clear()
         self.page_widget_controller.clear()
         self.deleted_pages.clear()
+        self.layout_changed.emit()
         self.page_rotations.clear()
 
         # Clear annotation storage with proper cleanup
@@ -372,8 +434,10 @@ class PDFViewer(QScrollArea):
             print("reload_document_after_edit: no doc_path set")
             return False
 
+        # Same file: its password is passed explicitly so the user is not asked again
+        password = self.document_password or None
         self.close_document()
-        return self.open_document(self.doc_path)
+        return self.open_document(self.doc_path, password=password)
 
     def _save_vector_immediate(self, widget, orig_page_num: int):
         """
@@ -397,7 +461,7 @@ class PDFViewer(QScrollArea):
 
             if (len(strokes) > 0) or (len(rects) > 0):
                 self.page_vectors[orig_page_num] = {"strokes": list(strokes), "rects": list(rects)}
-                print(f"[PDFViewer] _save_vector_immediate: saved vector for orig {orig_page_num}")
+                log.debug("_save_vector_immediate: saved vector for orig %s", orig_page_num)
 
             else:
                 if orig_page_num in self.page_vectors:
@@ -456,9 +520,10 @@ class PDFViewer(QScrollArea):
         """1-based display number for a layout index (skips deleted original page ids)"""
         if layout_index >= self.page_widget_controller.countTotalPagesInfo:
             return 1
+        deleted = self.deleted_pages
         display = 1
         for i, info in enumerate(self.page_widget_controller.pages_info):
-            if info.page_num in self.deleted_pages:
+            if info.page_num in deleted:
                 continue
             if i == layout_index:
                 return display
@@ -494,10 +559,12 @@ class PDFViewer(QScrollArea):
         """Update all page labels to reflect current order and visibility"""
         if not self.page_widget_controller:
             return
+        controller = self.page_widget_controller
+        deleted = self.deleted_pages
         display = 1
-        for i, widget in enumerate(self.page_widget_controller):
-            orig = self.page_widget_controller.getPageInfoByIndex(i).page_num
-            if orig in self.deleted_pages:
+        for i, widget in enumerate(controller):
+            orig = controller.getPageInfoByIndex(i).page_num
+            if orig in deleted:
                 continue
 
             # Update the widget's display text if it's showing placeholder text
@@ -861,7 +928,7 @@ class PDFViewer(QScrollArea):
         if not self.document or zoom == self.zoom_level:
             return
 
-        print(f"Setting zoom to {zoom}")
+        log.debug("Setting zoom to %s", zoom)
         # old_center = self.calculateCenter()
 
         self.cancel_all_renders()
@@ -1108,6 +1175,10 @@ class PDFViewer(QScrollArea):
 
         return self.total_page_count
 
+    def get_page_count(self) -> int:
+        """Current number of pages in the layout (cached, no document access)"""
+        return self.page_widget_controller.countTotalPagesInfo
+
     def get_current_page(self) -> int:
         """Return ORIGINAL page number for the currently centered page."""
         current_layout_idx = self.get_current_pageInfo_index()
@@ -1165,11 +1236,12 @@ class PDFViewer(QScrollArea):
             return False
 
     def get_visible_page_count(self) -> int:
-        count = 0
-        for info in self.page_widget_controller.pages_info:
-            if info.page_num not in self.deleted_pages:
-                count += 1
-        return count
+        """Number of pages still shown in the layout.
+
+        countTotalPagesInfo is kept up to date by reinitializePageWidgets after
+        every delete/insert, so no per-call scan over pages_info is needed.
+        """
+        return self.page_widget_controller.countTotalPagesInfo - len(self.deleted_pages)
 
     def request_center_on_layout_index(self, layout_index: int, delay_ms: int = 80):
         """Request centering on a layout index with debouncing."""
@@ -1602,8 +1674,12 @@ class PDFViewer(QScrollArea):
             (getattr(w, "overlay", None) and w.overlay.is_dirty()) for w in self.page_widget_controller.page_widgets)
 
     def clear_all_pages_overlay(self):
-        for i, widget_unit in enumerate(self.page_widget_controller):
-            widget_unit.overlay.clear_annotations()
+        # Only overlays that hold something need clearing, and without the per-overlay
+        # annotation_changed: its only effect (_save_vector_immediate) is undone by Clear() below
+        for widget_unit in self.page_widget_controller:
+            overlay = widget_unit.overlay
+            if not overlay.is_empty():
+                overlay.clear_annotations(emit=False)
         self.page_widget_controller.dict_vectors.Clear()
 
     # def set_drawing_mode(self, enabled: bool):
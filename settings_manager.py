@@ -1,8 +1,12 @@
-from PySide6.QtCore import QSettings, QSize, QPoint, QStandardPaths
+from PySide6.QtCore import QSettings, QSize, QPoint, QStandardPaths, QCoreApplication, QTimer
 import os
 import json
 
 
+# Cache marker for a key removed in memory but not yet from QSettings
+_REMOVED = object()
+
+
 class SettingsManager:
     DEFAULT_SIZE = QSize(1400, 800)
     DEFAULT_POSITION = QPoint(200, 200)
@@ -12,29 +16,126 @@ class SettingsManager:
     MAX_RECENT_FILES = 10
     DEFAULT_ZOOM_TYPE = 2
 
+    # Pending writes are also flushed after this much idle time, so a crash loses little
+    FLUSH_IDLE_MS = 2000
+
     def __init__(self):
         self.settings = QSettings("YourCompany", "PDFEditor")
+        # In-memory mirror of values already read/written. Writes (recent files,
+        # passwords, window state...) only land here and are marked dirty; sync()
+        # pushes them to QSettings in one go on close / aboutToQuit / after FLUSH_IDLE_MS
+        self._cache = {}
+        self._dirty = set()
+        self._quit_hooked = False
+        self._flush_timer = None
+
+    def _value(self, key: str, default=None, value_type=None):
+        """QSettings.value() with an in-memory cache"""
+        if key in self._cache:
+            value = self._cache[key]
+            if value is _REMOVED:
+                return default
+        else:
+            if value_type is None:
+                value = self.settings.value(key, default)
+            else:
+                value = self.settings.value(key, default, type=value_type)
+            self._cache[key] = value
+        # Lists are mutated by callers (recent files) - never hand out the cached one
+        return list(value) if isinstance(value, list) else value
+
+    def _set_value(self, key: str, value):
+        """Buffer a QSettings.setValue(); unchanged values are not even marked dirty"""
+        if isinstance(value, list):
+            value = list(value)
+        if key in self._cache and self._cache[key] == value:
+            return
+        self._cache[key] = value
+        self._mark_dirty(key)
+
+    def _remove(self, key: str):
+        self._cache[key] = _REMOVED
+        self._mark_dirty(key)
+
+    def _mark_dirty(self, key: str):
+        self._dirty.add(key)
+        self._hook_quit()
+        if self._flush_timer is not None:
+            # Restarted on every change: bursts of writes are flushed once they stop
+            self._flush_timer.start()
+
+    def _hook_quit(self):
+        # The global instance is created before QApplication, so connect lazily
+        if self._quit_hooked:
+            return
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.sync)
+            self._flush_timer = QTimer(app)
+            self._flush_timer.setSingleShot(True)
+            self._flush_timer.setInterval(self.FLUSH_IDLE_MS)
+            self._flush_timer.timeout.connect(self.sync)
+            self._quit_hooked = True
+
+    def sync(self):
+        """Write all pending changes to persistent storage at once"""
+        if self._flush_timer is not None:
+            self._flush_timer.stop()
+        if not self._dirty:
+            return
+        for key in self._dirty:
+            value = self._cache.get(key, _REMOVED)
+            if value is _REMOVED:
+                self.settings.remove(key)
+            else:
+                self.settings.setValue(key, value)
+        self.settings.sync()
+        self._dirty.clear()
+
+    def load_all(self) -> dict:
+        """Read the window and panel state in one pass.
+
+        Keys: size, position, maximized, panel_visible, panel_width, active_tab
+        """
+        size, position, maximized = self.load_window_state()
+        panel_visible, panel_width, active_tab = self.load_panel_state()
+        return {
+            "size": size,
+            "position": position,
+            "maximized": maximized,
+            "panel_visible": panel_visible,
+            "panel_width": panel_width,
+            "active_tab": active_tab,
+        }
+
+    def save_all(self, values: dict):
+        """Save the keys returned by load_all() (plus optional "zoom") in one pass, then flush once"""
+        self.save_window_state(values["size"], values["position"], values["maximized"])
+        self.save_panel_state(values["panel_visible"], values["panel_width"], values["active_tab"])
+        if values.get("zoom") is not None:
+            self.save_zoom_level(values["zoom"])
+        self.sync()
 
     def save_window_state(self, size: QSize, position: QPoint, maximized: bool):
         """Save window state"""
-        self.settings.setValue("window/size", size)
-        self.settings.setValue("window/position", position)
-        self.settings.setValue("window/maximized", maximized)
+        self._set_value("window/size", size)
+        self._set_value("window/position", position)
+        self._set_value("window/maximized", maximized)
 
     def load_window_state(self):
         """Load window state"""
-        size = self.settings.value("window/size", self.DEFAULT_SIZE)
-        position = self.settings.value("window/position", self.DEFAULT_POSITION)
-        maximized = self.settings.value("window/maximized", False, type=bool)
+        size = self._value("window/size", self.DEFAULT_SIZE)
+        position = self._value("window/position", self.DEFAULT_POSITION)
+        maximized = self._value("window/maximized", False, value_type=bool)
         return size, position, maximized
 
     def save_last_directory(self, directory: str):
         """Save last used directory"""
-        self.settings.setValue("last_directory", directory)
+        self._set_value("last_directory", directory)
 
     def get_last_directory(self):
         """Get last used directory"""
-        return self.settings.value(
+        return self._value(
             "last_directory",
             QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation)
         )
@@ -54,11 +155,11 @@ class SettingsManager:
         recent_files = recent_files[:self.MAX_RECENT_FILES]
 
         # Save back to settings
-        self.settings.setValue("recent_files", recent_files)
+        self._set_value("recent_files", recent_files)
 
     def get_recent_files(self):
         """Get list of recent files, filtering out non-existent files"""
-        recent_files = self.settings.value("recent_files", [], type=list)
+        recent_files = self._value("recent_files", [], value_type=list)
         # Filter out files that no longer exist
         existing_files = []
         for file_path in recent_files:
@@ -67,7 +168,7 @@ class SettingsManager:
 
         # Update settings if files were removed
         if len(existing_files) != len(recent_files):
-            self.settings.setValue("recent_files", existing_files)
+            self._set_value("recent_files", existing_files)
 
         return existing_files
 
@@ -76,26 +177,26 @@ class SettingsManager:
         recent_files = self.get_recent_files()
         if file_path in recent_files:
             recent_files.remove(file_path)
-            self.settings.setValue("recent_files", recent_files)
+            self._set_value("recent_files", recent_files)
 
     def clear_recent_files(self):
         """Clear all recent files"""
-        self.settings.setValue("recent_files", [])
+        self._set_value("recent_files", [])
 
     def save_panel_state(self, panel_visible: bool, panel_width: int, active_tab: str):
         """Save side panel state with width validation"""
         # Enforce minimum and maximum width
         panel_width = max(self.MIN_PANEL_WIDTH, min(panel_width, self.MAX_PANEL_WIDTH))
 
-        self.settings.setValue("panel/visible", panel_visible)
-        self.settings.setValue("panel/width", panel_width)
-        self.settings.setValue("panel/active_tab", active_tab)
+        self._set_value("panel/visible", panel_visible)
+        self._set_value("panel/width", panel_width)
+        self._set_value("panel/active_tab", active_tab)
 
     def load_panel_state(self):
         """Load side panel state"""
-        visible = self.settings.value("panel/visible", True, type=bool)
-        width = self.settings.value("panel/width", self.DEFAULT_PANEL_WIDTH, type=int)
-        active_tab = self.settings.value("panel/active_tab", "pages", type=str)
+        visible = self._value("panel/visible", True, value_type=bool)
+        width = self._value("panel/width", self.DEFAULT_PANEL_WIDTH, value_type=int)
+        active_tab = self._value("panel/active_tab", "pages", value_type=str)
 
         # Enforce width limits
         width = max(self.MIN_PANEL_WIDTH, min(width, self.MAX_PANEL_WIDTH))
@@ -104,32 +205,32 @@ class SettingsManager:
 
     def save_thumbnail_size(self, size: int):
         """Save thumbnail size setting"""
-        self.settings.setValue("thumbnails/size", size)
+        self._set_value("thumbnails/size", size)
 
     def get_thumbnail_size(self):
         """Get thumbnail size setting"""
-        return self.settings.value("thumbnails/size", 100, type=int)
+        return self._value("thumbnails/size", 100, value_type=int)
 
     def save_zoom_level(self, zoom: float):
         """Save last zoom level"""
-        self.settings.setValue("view/zoom", zoom)
+        self._set_value("view/zoom", zoom)
 
     def get_zoom_level(self):
         """Get last zoom level"""
-        return self.settings.value("view/zoom", 1.0, type=float)
+        return self._value("view/zoom", 1.0, value_type=float)
 
     def save_encryption_password(self, file_path: str, password: str):
         """Save password for encrypted PDF (use with caution!)"""
         # Note: This stores passwords in plaintext - consider encryption in production
-        self.settings.setValue(f"passwords/{file_path}", password)
+        self._set_value(f"passwords/{file_path}", password)
 
     def get_encryption_password(self, file_path: str):
         """Get stored password for encrypted PDF"""
-        return self.settings.value(f"passwords/{file_path}", "", type=str)
+        return self._value(f"passwords/{file_path}", "", value_type=str)
 
     def remove_encryption_password(self, file_path: str):
         """Remove stored password"""
-        self.settings.remove(f"passwords/{file_path}")
+        self._remove(f"passwords/{file_path}")
 
 
 # Global instance
@@ -1,18 +1,29 @@
+import hashlib
+import logging
 import math
+import os
+import shutil
+from collections import OrderedDict
 from typing import Optional, Dict, List
 
 from PySide6.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QSpacerItem, QSizePolicy,
     QScrollArea, QFrame
 )
-from PySide6.QtGui import QPainter, QPen, QColor, QPixmap, QMouseEvent, QPaintEvent
-from PySide6.QtCore import Qt, QRect, QPoint, QBuffer, Signal, QSize, QTimer
+from PySide6.QtGui import QPainter, QPen, QColor, QPixmap, QMouseEvent, QPaintEvent, QTransform, QImage
+from PySide6.QtCore import (
+    Qt, QRect, QPoint, QBuffer, QByteArray, QIODevice, Signal, QSize, QTimer, QStandardPaths, QThreadPool
+)
 
 from dataclasses import dataclass
 import fitz  # PyMuPDF
 
-from classes.document import Document
+from classes.document import Document, PageInfo
 from classes.mapPage import MapPage
+from classes.rendering import ThumbnailRenderSignals, ThumbnailRenderWorker
+
+# Per-page-change tracing; silent unless DEBUG is enabled
+log = logging.getLogger(__name__)
 
 
 @dataclass
@@ -24,19 +35,200 @@ class ThumbnailInfo:
     rotation: int = 0
 
 
+class ThumbnailDiskCache:
+    """PNG thumbnails on disk, reused when the same unmodified file is opened again.
+
+    Each opened file gets a directory keyed by (path, size, mtime, thumbnail
+    size), so a file changed on disk never hits stale entries. Only the
+    max_docs most recently opened files are kept.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_docs: int = 50):
+        self.root = root or os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.CacheLocation), "thumbnails")
+        self.max_docs = max_docs
+        self._dir: Optional[str] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._dir is not None
+
+    def open(self, file_path: str, thumbnail_size: int) -> bool:
+        """Point the cache at file_path as it is on disk right now"""
+        self._dir = None
+        try:
+            st = os.stat(file_path)
+            key = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}|{thumbnail_size}"
+            directory = os.path.join(self.root, hashlib.sha1(key.encode("utf-8")).hexdigest())
+            os.makedirs(directory, exist_ok=True)
+            # mtime of the directory = last time the file was opened (used for pruning)
+            os.utime(directory)
+            self._dir = directory
+            self._prune()
+        except OSError as e:
+            log.warning("Thumbnail disk cache unavailable: %s", e)
+        return self._dir is not None
+
+    def close(self):
+        self._dir = None
+
+    def _page_path(self, page_num: int) -> str:
+        return os.path.join(self._dir, f"{page_num}.png")
+
+    def get(self, page_num: int) -> Optional[QPixmap]:
+        if self._dir is None:
+            return None
+        pixmap = QPixmap()
+        if not pixmap.load(self._page_path(page_num), "PNG"):
+            return None
+        return pixmap
+
+    def put(self, page_num: int, entry):
+        """entry is a QPixmap or PNG bytes already encoded by ThumbnailCache.compress"""
+        if self._dir is None:
+            return
+        path = self._page_path(page_num)
+        try:
+            if isinstance(entry, QPixmap):
+                entry.save(path, "PNG")
+            else:
+                with open(path, "wb") as f:
+                    f.write(bytes(entry))
+        except OSError as e:
+            log.warning("Cannot write thumbnail %s: %s", path, e)
+
+    def _prune(self):
+        try:
+            entries = [e for e in os.scandir(self.root) if e.is_dir()]
+        except OSError:
+            return
+        if len(entries) <= self.max_docs:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        for entry in entries[self.max_docs:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+class ThumbnailCache:
+    """LRU of rendered thumbnails (without the page number bar), keyed by original page number.
+
+    Widgets outside the MapPage window are destroyed while scrolling; the cache lets
+    them come back without re-rendering the page. The max_live most recently used
+    entries stay as QPixmap; older ones are re-encoded to PNG once the list is idle,
+    which is several times smaller. At most max_size entries are kept in total.
+
+    With an open `disk` cache, misses fall through to it and new renders are
+    written there once the list is idle (together with the compression pass).
+    """
+
+    def __init__(self, max_size: int = 256, compress_delay_ms: int = 200, max_live: int = 64):
+        self.max_size = max_size
+        self.max_live = max_live
+        self.cache: OrderedDict[int, object] = OrderedDict()  # QPixmap or PNG QByteArray
+        self.disk = ThumbnailDiskCache()
+        # Rendered this session, not on disk yet
+        self._disk_pending: set = set()
+
+        self._compress_timer = QTimer()
+        self._compress_timer.setSingleShot(True)
+        self._compress_timer.setInterval(compress_delay_ms)
+        self._compress_timer.timeout.connect(self.compress)
+
+    def set_policy(self, max_live: int, max_compressed: int):
+        """max_live raw pixmaps, max_compressed entries in total (LRU beyond that)"""
+        self.max_live = max(0, max_live)
+        self.max_size = max(self.max_live, max_compressed)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        self._compress_timer.start()
+
+    def get(self, page_num: int) -> Optional[QPixmap]:
+        entry = self.cache.get(page_num)
+        if entry is None:
+            pixmap = self.disk.get(page_num)
+            if pixmap is not None:
+                self.cache[page_num] = pixmap
+                while len(self.cache) > self.max_size:
+                    self.cache.popitem(last=False)
+                self._compress_timer.start()
+            return pixmap
+        self.cache.move_to_end(page_num)
+        if isinstance(entry, QPixmap):
+            return entry
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(entry, "PNG"):
+            del self.cache[page_num]
+            return None
+        return pixmap
+
+    def put(self, page_num: int, pixmap: QPixmap):
+        self.cache[page_num] = pixmap
+        if self.disk.is_open:
+            self._disk_pending.add(page_num)
+        self.cache.move_to_end(page_num)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        self._compress_timer.start()
+
+    def compress(self):
+        """Replace raw QPixmap entries beyond the max_live most recent with PNG-encoded bytes"""
+        cold = len(self.cache) - self.max_live
+        for page_num, entry in list(self.cache.items())[:max(0, cold)]:
+            if not isinstance(entry, QPixmap):
+                continue
+            data = QByteArray()
+            buf = QBuffer(data)
+            buf.open(QIODevice.WriteOnly)
+            ok = entry.save(buf, "PNG")
+            buf.close()
+            if ok:
+                self.cache[page_num] = data
+        self.flush_to_disk()
+
+    def flush_to_disk(self):
+        for page_num in self._disk_pending:
+            entry = self.cache.get(page_num)
+            if entry is not None:
+                self.disk.put(page_num, entry)
+        self._disk_pending.clear()
+
+    def open_disk(self, file_path: str, thumbnail_size: int) -> bool:
+        self._disk_pending.clear()
+        return self.disk.open(file_path, thumbnail_size)
+
+    def close_disk(self):
+        """The document no longer matches its file (e.g. rotated): stop reading and writing disk"""
+        self._disk_pending.clear()
+        self.disk.close()
+
+    def discard(self, page_num: int):
+        self.cache.pop(page_num, None)
+        self._disk_pending.discard(page_num)
+
+    def clear(self):
+        self._compress_timer.stop()
+        self.flush_to_disk()
+        self.disk.close()
+        self.cache.clear()
+
+
 class ThumbnailWidget(QWidget):
     """Widget for displaying a single thumbnail"""
     clicked = Signal(int)
 
-    def __init__(self, page, thumbnail_info: ThumbnailInfo, layout_index: int, zoom: float = 1.0):
+    THUMBNAIL_SIZE = 100
+
+    def __init__(self, page, thumbnail_info: ThumbnailInfo, layout_index: int, zoom: float = 1.0,
+                 thumb_cache: Optional[ThumbnailCache] = None):
         super().__init__()
         self.thumbnail_info = thumbnail_info
         self.layout_index = layout_index
         self.zoom = zoom
+        self.thumb_cache = thumb_cache
 
         self.page = page
 
-        self.thumbnail_size = 100
+        self.thumbnail_size = self.THUMBNAIL_SIZE
 
         self.is_selected = False
         self.is_hovered = False
@@ -46,6 +238,8 @@ class ThumbnailWidget(QWidget):
 
         # Thumbnail pixmap
         self.thumbnail_pixmap: Optional[QPixmap] = None
+        # Render without the page number bar (used for in-place rotation)
+        self.base_pixmap: Optional[QPixmap] = None
         self.is_loaded = False
 
     def isVisibleByScrollViewport(self, scroll: int, viewport_height: int):
@@ -56,43 +250,41 @@ class ThumbnailWidget(QWidget):
 
         return max(top, self.y()) <= min(bottom, self.y() + self.height())
 
+    def load_cached(self) -> bool:
+        """Show the cached render, if there is one, without rendering the page"""
+        if self.is_loaded:
+            return True
+        cached = self.thumb_cache.get(self.thumbnail_info.page_num) if self.thumb_cache is not None else None
+        if cached is None:
+            return False
+        self.set_base_pixmap(cached)
+        return True
+
+    def set_base_pixmap(self, pixmap: QPixmap):
+        """Show a render of the page (without the page number bar)"""
+        self.thumbnail_pixmap = pixmap
+        self.base_pixmap = pixmap
+        self._add_page_number_overlay()
+        self.is_loaded = True
+        self.update()
+
     def load_thumbnail(self):
-        """Load thumbnail from document"""
+        """Load thumbnail from document (renders on the GUI thread on a cache miss)"""
         if self.is_loaded:
             return
 
         try:
-
-            page = self.page
+            if self.load_cached():
+                return
 
             # # Apply rotation if needed
             # if self.thumbnail_info.rotation != 0:
             #     page.set_rotation(self.thumbnail_info.rotation)
 
-            # Calculate scale for fixed thumbnail size
-            rect = page.rect
-            scale = min(self.thumbnail_size / rect.width, self.thumbnail_size / rect.height)
-            matrix = fitz.Matrix(scale, scale)
-
-            pix = page.get_pixmap(
-                matrix=matrix,
-                alpha=False,
-                colorspace=fitz.csRGB
-            )
-
-            img_data = pix.tobytes("ppm")
-            self.thumbnail_pixmap = QPixmap()
-            self.thumbnail_pixmap.loadFromData(img_data)
-
-            del pix
-            del matrix
-
-            # Add page number overlay
-            self._add_page_number_overlay()
-            self.is_loaded = True
-
-            # Trigger repaint
-            self.update()
+            pixmap = QPixmap.fromImage(ThumbnailRenderWorker.render_image(self.page, self.thumbnail_size))
+            if self.thumb_cache is not None:
+                self.thumb_cache.put(self.thumbnail_info.page_num, pixmap)
+            self.set_base_pixmap(pixmap)
 
         except Exception as e:
             print(f"Error loading thumbnail for page {self.thumbnail_info.page_num}: {e}")
@@ -127,6 +319,17 @@ class ThumbnailWidget(QWidget):
 
         self.thumbnail_pixmap = result
 
+    def rotate_loaded_thumbnail(self, rotation: int):
+        """Rotate the already rendered thumbnail instead of re-rendering the page"""
+        if not self.is_loaded or self.base_pixmap is None or self.base_pixmap.isNull():
+            return False
+        # Multiples of 90° are exact, no smoothing needed
+        self.base_pixmap = self.base_pixmap.transformed(QTransform().rotate(rotation))
+        self.thumbnail_pixmap = self.base_pixmap
+        self._add_page_number_overlay()
+        self.update()
+        return True
+
     def set_selected(self, selected: bool):
         self.is_selected = selected
         self.update()  # Redraws the thing
@@ -211,6 +414,7 @@ class ThumbnailWidget(QWidget):
         """Clean up resources"""
         if self.thumbnail_pixmap:
             self.thumbnail_pixmap = QPixmap()
+        self.base_pixmap = None
         self.is_loaded = False
 
 
@@ -234,6 +438,8 @@ class ThumbnailWidgetStack(QVBoxLayout):
         self.current_selected_widget: Optional[ThumbnailWidget] = None
 
         self.thumbnail_widgets: List[ThumbnailWidget] = []
+        # original page number -> widget, kept in sync by add/insert/removeThumbnailWidget
+        self._widgets_by_page: Dict[int, ThumbnailWidget] = {}
         self.zoom = 1.0  # Fixed for thumbnails
         self.spacer: QSpacerItem = QSpacerItem(0, 0)
         self.isSpacer = False
@@ -250,6 +456,16 @@ class ThumbnailWidgetStack(QVBoxLayout):
 
         # Track loaded thumbnails
         self.loaded_thumbnails = set()
+        # Rendered thumbnails survive widget recycling while scrolling
+        self.thumb_cache = ThumbnailCache(max_size=256)
+
+        # Background rendering (see set_render_pool); without a pool rows render synchronously
+        self._render_pool: Optional[QThreadPool] = None
+        self._render_signals = ThumbnailRenderSignals()
+        self._render_signals.finished.connect(self._on_thumbnail_rendered)
+        # original page number -> queued/running worker; results are only taken from these
+        self._pending_renders: Dict[int, ThumbnailRenderWorker] = {}
+        self._render_token = 0
 
         self.current_doc: Document = None
 
@@ -267,8 +483,12 @@ class ThumbnailWidgetStack(QVBoxLayout):
     #             self.current_selected_page = page_num
     #             break
 
-    def set_document_stack(self, document: Document):
-        """Set the document to display thumbnails for"""
+    def set_document_stack(self, document: Document, pages_info: Optional[List[PageInfo]] = None):
+        """Set the document to display thumbnails for.
+
+        pages_info (e.g. the viewer's list for the same document) supplies the
+        page sizes, so no page has to be loaded just to read its rect.
+        """
         # print(f"Stack caught set_document_stack function call from container")
 
         self.clear()
@@ -281,23 +501,28 @@ class ThumbnailWidgetStack(QVBoxLayout):
         if self.current_doc:
             # Create thumbnail info for all pages
             thumbnails_info = []
-            for page_num in range(document.get_page_count()):
-                page = document.get_page(page_num)
-                rect = page.rect
-                thumbnail_info = ThumbnailInfo(
-                    page_num=page_num,
-                    width=rect.width,
-                    height=rect.height
-                )
-                thumbnails_info.append(thumbnail_info)
+            if pages_info is not None and len(pages_info) == document.get_page_count():
+                for info in pages_info:
+                    thumbnails_info.append(ThumbnailInfo(page_num=info.page_num, width=info.width,
+                                                         height=info.height))
+            else:
+                for page_num in range(document.get_page_count()):
+                    page = document.get_page(page_num)
+                    rect = page.rect
+                    thumbnail_info = ThumbnailInfo(
+                        page_num=page_num,
+                        width=rect.width,
+                        height=rect.height
+                    )
+                    thumbnails_info.append(thumbnail_info)
 
             # self.countTotalThumbnailsInfo = len(self.thumbnails_info)
             self.initThumbnailInfoList(thumbnails_info)
             # print(f"thumbnails_info = {self.thumbnails_info}")
             # print(f"countTotalThumbnailsInfo = {self.countTotalThumbnailsInfo}")
 
-            # Load initial thumbnails
-            self.calculateMapPagesByIndex(0)
+            # Widgets only; the container renders the visible rows
+            self.calculateMapPagesByIndex(0, load=False)
 
     # НЕ ИСПОЛЬЗУЕТСЯ
     # def setZoom(self, newZoom):
@@ -321,6 +546,7 @@ class ThumbnailWidgetStack(QVBoxLayout):
     def addThumbnailWidget(self, thumbnailWidget: ThumbnailWidget, addLayout: bool = True):
         try:
             self.thumbnail_widgets.append(thumbnailWidget)
+            self._widgets_by_page[thumbnailWidget.thumbnail_info.page_num] = thumbnailWidget
             if addLayout:
                 self.addWidget(thumbnailWidget)
         except Exception as e:
@@ -329,6 +555,7 @@ class ThumbnailWidgetStack(QVBoxLayout):
     def insertThumbnailWidget(self, index: int, widget: ThumbnailWidget):
         try:
             self.thumbnail_widgets.insert(index, widget)
+            self._widgets_by_page[widget.thumbnail_info.page_num] = widget
             if self.isSpacer:
                 index += 1
             self.insertWidget(index, widget)
@@ -338,6 +565,9 @@ class ThumbnailWidgetStack(QVBoxLayout):
     def removeThumbnailWidget(self, thumbnailWidget: ThumbnailWidget):
         try:
             self.thumbnail_widgets.remove(thumbnailWidget)
+            page_num = thumbnailWidget.thumbnail_info.page_num
+            if self._widgets_by_page.get(page_num) is thumbnailWidget:
+                del self._widgets_by_page[page_num]
             self.removeWidget(thumbnailWidget)
             thumbnailWidget.clean()
             thumbnailWidget.deleteLater()
@@ -453,8 +683,12 @@ class ThumbnailWidgetStack(QVBoxLayout):
 
         return False
 
-    def calculateMapPagesByIndex(self, index: int):
-        """Calculate and update which thumbnails to display"""
+    def calculateMapPagesByIndex(self, index: int, load: bool = True):
+        """Calculate and update which thumbnails to display.
+
+        load=False only builds the widgets; the caller renders the rows it
+        needs with load_thumbnails_in_range().
+        """
         map_thumbnails = []
 
         # print("Entering calculateMapPagesByIndex...")
@@ -479,7 +713,8 @@ class ThumbnailWidgetStack(QVBoxLayout):
                         self.current_doc.get_page(thumbnail_info_i.page_num),
                         thumbnail_info_i,
                         i,
-                        zoom=self.zoom
+                        zoom=self.zoom,
+                        thumb_cache=self.thumb_cache
                     )
                     # Connect click signal
                     # newWidget.clicked.connect(self.page_clicked.emit)
@@ -521,12 +756,84 @@ class ThumbnailWidgetStack(QVBoxLayout):
             else:
                 self.removeSpacer()
 
-            for th in self.thumbnail_widgets:
-                th.load_thumbnail()
+            if load:
+                for th in self.thumbnail_widgets:
+                    th.load_thumbnail()
 
         except Exception as e:
             raise Exception(f"Error calculating thumbnail map: {e}")
 
+    def set_render_pool(self, pool: Optional[QThreadPool]):
+        """Render thumbnails on pool (below the priority of page renders) instead of the GUI thread"""
+        self._render_pool = pool
+
+    def load_thumbnails_in_range(self, first: int, last: int, prefetch: int = 0):
+        """Show the mapped thumbnails with layout index in [first, last], plus prefetch rows on each side.
+
+        Cached renders are shown at once. With a render pool the rest are queued,
+        rows in [first, last] ahead of the prefetch rows; queued renders that left
+        the window (fast scrolling) are cancelled.
+        """
+        lo, hi = first - prefetch, last + prefetch
+        if self._render_pool is None:
+            for th in self.thumbnail_widgets:
+                if lo <= th.layout_index <= hi:
+                    th.load_thumbnail()
+            return
+
+        for page_num, worker in list(self._pending_renders.items()):
+            widget = self._widget_for_page(page_num)
+            if widget is None or not lo <= widget.layout_index <= hi:
+                worker.cancel()
+                del self._pending_renders[page_num]
+
+        for th in self.thumbnail_widgets:
+            index = th.layout_index
+            if lo <= index <= hi and not th.load_cached():
+                self._queue_render(th, self.RENDER_PRIORITY_VISIBLE if first <= index <= last
+                                   else self.RENDER_PRIORITY_PREFETCH)
+
+    # Page renders run at the pool's default priority 0
+    RENDER_PRIORITY_VISIBLE = -1
+    RENDER_PRIORITY_PREFETCH = -2
+
+    def _widget_for_page(self, page_num: int) -> Optional[ThumbnailWidget]:
+        return self._widgets_by_page.get(page_num)
+
+    def _queue_render(self, widget: ThumbnailWidget, priority: int):
+        page_num = widget.thumbnail_info.page_num
+        if page_num in self._pending_renders:
+            return
+        self._render_token += 1
+        worker = ThumbnailRenderWorker(widget.page, page_num, widget.thumbnail_size,
+                                       self._render_token, self._render_signals)
+        self._pending_renders[page_num] = worker
+        self._render_pool.start(worker, priority)
+
+    def _cancel_render(self, page_num: int):
+        worker = self._pending_renders.pop(page_num, None)
+        if worker is not None:
+            worker.cancel()
+
+    def _cancel_all_renders(self):
+        for worker in self._pending_renders.values():
+            worker.cancel()
+        self._pending_renders.clear()
+
+    def _on_thumbnail_rendered(self, page_num: int, token: int, image: QImage):
+        worker = self._pending_renders.get(page_num)
+        if worker is None or worker.token != token:
+            # Cancelled, superseded (e.g. page rotated meanwhile) or document changed
+            return
+        del self._pending_renders[page_num]
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.thumb_cache.put(page_num, pixmap)
+        widget = self._widget_for_page(page_num)
+        if widget is not None and not widget.is_loaded:
+            widget.set_base_pixmap(pixmap)
+
     def _on_thumbnail_clicked(self, page_num: int):
         """Клик по миниатюре"""
         self.page_clicked.emit(page_num)  # Emitter
@@ -534,7 +841,7 @@ class ThumbnailWidgetStack(QVBoxLayout):
 
     def highlight_page(self, page_num: int):
         """Highlight the thumbnail for the given page number"""
-        print(f"Executing highlight {page_num} page function")
+        log.debug("Executing highlight %s page function", page_num)
         if self.selection_mode_single:
             self._deselect_all_thumbnails()
             self._select_thumbnail(page_num)
@@ -563,7 +870,7 @@ class ThumbnailWidgetStack(QVBoxLayout):
 
     def _select_thumbnail(self, page_num: int):
         """Select a thumbnail by page number"""
-        print(f"Selecting {page_num} page...")
+        log.debug("Selecting %s page...", page_num)
 
         if page_num in self.selected_thumbnails:
             return
@@ -580,7 +887,7 @@ class ThumbnailWidgetStack(QVBoxLayout):
 
     def _deselect_thumbnail(self, page_num: int):
         """Deselect a thumbnail by page number"""
-        print(f"Deselecting {page_num} page...")
+        log.debug("Deselecting %s page...", page_num)
         if page_num not in self.selected_thumbnails:
             return
 
@@ -628,27 +935,27 @@ class ThumbnailWidgetStack(QVBoxLayout):
     # def clear_selection(self):
     #     self._deselect_all_thumbnails()
 
-    # TODO: add thumbnail rotation on page edit event
     def rotate_page_thumbnail(self, page_num: int, rotation: int):
-        """Rotate a page thumbnail"""
-        # Find thumbnail info and update rotation
+        """Rotate a page thumbnail in place (no re-render from the PDF)"""
+        # Widgets share ThumbnailInfo objects with thumbnails_info, so update it once
         for thumb_info in self.thumbnails_info:
             if thumb_info.page_num == page_num:
-                current_rotation = thumb_info.rotation
-                new_rotation = (current_rotation + rotation) % 360
-                thumb_info.rotation = new_rotation
+                thumb_info.rotation = (thumb_info.rotation + rotation) % 360
                 break
 
-        # Reload thumbnail
-        for widget in self.thumbnail_widgets:
-            if widget.thumbnail_info.page_num == page_num:
-                current_rotation = widget.thumbnail_info.rotation
-                new_rotation = (current_rotation + rotation) % 360
-                widget.thumbnail_info.rotation = new_rotation
+        # Cached render is stale now; widgets that are not loaded yet will
+        # render the rotated page on demand. The file on disk is unrotated,
+        # so its thumbnail directory must not be used for this document any more
+        self.thumb_cache.close_disk()
+        self._cancel_render(page_num)
+        self.thumb_cache.discard(page_num)
+        widget = self._widget_for_page(page_num)
+        if widget is not None:
+            if widget.rotate_loaded_thumbnail(rotation):
+                self.thumb_cache.put(page_num, widget.base_pixmap)
+            else:
                 widget.is_loaded = False
-                if self.doc_path:
-                    widget.load_thumbnail()
-                break
+                widget.load_thumbnail()
 
     def update_thumbnails_order(self, visible_order: List[int]):
         """Update display order of thumbnails"""
@@ -677,6 +984,7 @@ class ThumbnailWidgetStack(QVBoxLayout):
 
     def clear(self):
         """Clear all thumbnails"""
+        self._cancel_all_renders()
         self.countTotalThumbnailsInfo = 0
         self.thumbnails_info = []
 
@@ -684,6 +992,7 @@ class ThumbnailWidgetStack(QVBoxLayout):
             self.removeThumbnailWidget(self.thumbnail_widgets[0])
 
         self.thumbnail_widgets.clear()
+        self._widgets_by_page.clear()
 
         if self.isSpacer:
             self.removeSpacer()
@@ -692,6 +1001,7 @@ class ThumbnailWidgetStack(QVBoxLayout):
         self.doc_path = ""
         self.document_password = ""
         self.loaded_thumbnails.clear()
+        self.thumb_cache.clear()
 
 
 # Container widget for the thumbnail stack
@@ -700,6 +1010,9 @@ class ThumbnailContainerWidget(QScrollArea):
 
     page_clicked = Signal(int)
 
+    # Rows rendered above and below the viewport ahead of scrolling
+    PREFETCH_ROWS = 5
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
@@ -738,6 +1051,26 @@ class ThumbnailContainerWidget(QScrollArea):
         """Handle scroll events to update visible thumbnails"""
         self.scroll_timer.start(200)
 
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Showing the panel or making it taller exposes rows that were not rendered yet
+        if self.document is not None:
+            self.scroll_timer.start(200)
+
+    def _load_visible_thumbnails(self):
+        """Render only the rows in the viewport plus PREFETCH_ROWS on each side"""
+        stack = self.thumbnail_stack
+        if stack.countTotalThumbnailsInfo == 0:
+            return
+        value = self.verticalScrollBar().value()
+        first = stack.getCurrThumbnailIndexByHeightScroll(value)
+        last = stack.getCurrThumbnailIndexByHeightScroll(value + self.viewport().height())
+        if first < 0:
+            first = 0
+        if last < 0:
+            last = stack.countTotalThumbnailsInfo - 1
+        stack.load_thumbnails_in_range(first, last, self.PREFETCH_ROWS)
+
     # Dupes the function in stack
     def _scroll_to_thumbnail(self, page_num: int):
 
@@ -769,18 +1102,21 @@ class ThumbnailContainerWidget(QScrollArea):
         if self.thumbnail_stack.needCalculateByScrollHeight(value):
             index = self.thumbnail_stack.getCurrThumbnailIndexByHeightScroll(value)
             if index >= 0:
-                self.thumbnail_stack.calculateMapPagesByIndex(index)
+                self.thumbnail_stack.calculateMapPagesByIndex(index, load=False)
 
-        # self.thumbnail_stack
-        for widget_tn in self.thumbnail_stack.thumbnail_widgets:
-            if widget_tn.isVisibleByScrollViewport(self.verticalScrollBar().value() - 100,
-                                                   self.viewport().rect().height() + 100):
-                widget_tn.load_thumbnail()
+        self._load_visible_thumbnails()
 
-    def set_document(self, document):
-        """Set the document to display thumbnails for"""
+    def set_document(self, document, pages_info: Optional[List[PageInfo]] = None,
+                     file_path: Optional[str] = None):
+        """Set the document to display thumbnails for.
+
+        file_path is given only when the document is exactly what is on disk;
+        thumbnails saved for that file in an earlier session are reused.
+        """
         self.document = document
-        self.thumbnail_stack.set_document_stack(document)
+        self.thumbnail_stack.set_document_stack(document, pages_info)
+        if document is not None and file_path:
+            self.thumbnail_stack.thumb_cache.open_disk(file_path, ThumbnailWidget.THUMBNAIL_SIZE)
         self.container_widget.setMinimumHeight(
             self.thumbnail_stack.getTotalHeightByCountThumbnails(self.thumbnail_stack.countTotalThumbnailsInfo))
         self.container_widget.adjustSize()
@@ -808,20 +1144,19 @@ class ThumbnailContainerWidget(QScrollArea):
 
         # Ensure the thumbnail map is calculated so the widget exists
         try:
-            self.thumbnail_stack.calculateMapPagesByIndex(page_index)
+            self.thumbnail_stack.calculateMapPagesByIndex(page_index, load=False)
         except Exception as e:
             print(f"[ThumbnailContainerWidget] calculateMapPagesByIndex failed: {e}")
 
+        # Scroll to make the thumbnail visible
+        self._scroll_to_thumbnail(page_num)
+
         # Load thumbnails that are now in view
         try:
-            for widget_tn in self.thumbnail_stack.thumbnail_widgets:
-                widget_tn.load_thumbnail()
+            self._load_visible_thumbnails()
         except Exception:
             pass
 
-        # Scroll to make the thumbnail visible
-        self._scroll_to_thumbnail(page_num)
-
         # Highlight after a short delay so Qt has time to process layout/scroll
         QTimer.singleShot(50, lambda: self._highlight_after_scroll(page_num, page_index))
 
@@ -835,12 +1170,11 @@ class ThumbnailContainerWidget(QScrollArea):
         if getattr(self, '_pending_page_num', None) == page_num:
             self._pending_page_num = None
         try:
-            self.thumbnail_stack.calculateMapPagesByIndex(page_index)
+            self.thumbnail_stack.calculateMapPagesByIndex(page_index, load=False)
         except Exception:
             pass
         try:
-            for widget_tn in self.thumbnail_stack.thumbnail_widgets:
-                widget_tn.load_thumbnail()
+            self._load_visible_thumbnails()
         except Exception:
             pass
         self.thumbnail_stack.highlight_page(page_num)
@@ -867,6 +1201,14 @@ class ThumbnailContainerWidget(QScrollArea):
     def clear_thumbnails(self):
         self.clear()
 
+    def set_render_pool(self, pool):
+        """Render thumbnails in the background on pool (e.g. the viewer's render pool)"""
+        self.thumbnail_stack.set_render_pool(pool)
+
+    def set_cache_policy(self, max_live: int = 64, max_compressed: int = 512):
+        """Bound the thumbnail cache: max_live raw pixmaps, max_compressed entries overall"""
+        self.thumbnail_stack.thumb_cache.set_policy(max_live, max_compressed)
+
     def refresh_thumbnails(self, document: Document):
         self.clear_thumbnails()
         self.set_document(document)
@@ -8,11 +8,14 @@ from PySide6.QtWidgets import (QMenu, QMenuBar, QSizePolicy, QSplitter, QStatusB
                                QSlider, QSpinBox)
 from PySide6.QtPdf import QPdfDocument, QPdfBookmarkModel
 from PySide6.QtPdfWidgets import QPdfView
+import logging
 import sys
 import os
 from thumbnail_widget import ThumbnailContainerWidget
 from pdf_viewer import PDFViewer
 
+log = logging.getLogger(__name__)
+
 try:
     import resources
 except ImportError:
@@ -21,7 +24,7 @@ except ImportError:
 
 class ZoomSelector(QWidget):
     """Simple zoom selector widget"""
-    from PySide6.QtCore import Signal
+    from PySide6.QtCore import Signal, Slot
 
     zoom_changed = Signal(float)
 
@@ -40,6 +43,7 @@ class ZoomSelector(QWidget):
         self.zoom_input.returnPressed.connect(self.on_zoom_input)
         layout.addWidget(self.zoom_input)
 
+    @Slot()
     def on_zoom_input(self):
         try:
             text = self.zoom_input.text().replace('%', '')
@@ -48,6 +52,7 @@ class ZoomSelector(QWidget):
         except ValueError:
             pass
 
+    @Slot(float)
     def set_zoom_value(self, zoom):
         self.zoom_input.setText(f"{int(zoom * 100)}%")
 
@@ -133,7 +138,9 @@ class UiMainWindow(object):
             ui_localization.translate_ui(self, main_window, localization_language)
             ui_localization.shortcuts_ui(self)
         except ImportError:
-            print("Warning: ui_localization module not found. Using default text.")
+            log.warning("ui_localization module not found. Using default text.")
+        except Exception:
+            log.exception("Error applying localization")
 
     def setup_layout(self, main_window):
         """Setup main layout with central widget and splitter"""